@@ -0,0 +1,104 @@
+"""Local stand-in for the solarprognose.de API."""
+
+from __future__ import annotations
+
+import json
+import math
+import time
+from typing import Any
+
+from aiohttp import web
+
+API_PATH = "/web/solarprediction/api/v1"
+
+MODE_OK = "ok"
+MODE_ERROR = "error"
+MODE_RATE_LIMIT = "rate_limit"
+
+
+def build_payload(
+    days: int, step: int, start: int | None = None, revision: int = 0
+) -> dict[str, Any]:
+    """Return an API response with ``days`` days of data every ``step`` seconds."""
+    now = int(time.time())
+    if start is None:
+        start = now - now % 86400
+    data: dict[str, list[float]] = {}
+    cumulative = 0.0
+    previous = 0.0
+    for ts in range(start, start + days * 86400, step):
+        hour = (ts % 86400) / 3600
+        # Glockenkurve zwischen 5 und 21 Uhr, je Revision leicht verändert
+        power = max(0.0, math.sin((hour - 5) / 16 * math.pi)) * (5 + revision % 7 * 0.1)
+        cumulative += (previous + power) / 2 * step / 3600
+        previous = power
+        data[str(ts)] = [ts, round(power, 3), round(cumulative, 3)]
+    return {
+        "preferredNextApiRequestAt": {
+            "secondOfHour": 120,
+            "epochTimeUtc": now + 3600,
+        },
+        "status": 0,
+        "iLastPredictionGenerationEpochTime": now,
+        "weather_source_text": "benchmark",
+        "datalinelayout": "[epochtimeUTC, power kW, cumulated kWh]",
+        "data": data,
+    }
+
+
+class FakeSolarPrognoseApi:
+    """Serves generated forecasts and counts the requests it answers."""
+
+    def __init__(self, days: int = 2, step: int = 3600) -> None:
+        self.days = days
+        self.step = step
+        self.mode = MODE_OK
+        self.retry_after = 120
+        self.revision = 0
+        self.requests = 0
+        self._body: tuple[tuple[int, int, int], bytes] | None = None
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+    def bump(self) -> None:
+        """Change the forecast values of the next responses."""
+        self.revision += 1
+
+    def prepare(self) -> bytes:
+        """Build and encode the response once per horizon, step and revision."""
+        key = (self.days, self.step, self.revision)
+        if self._body is None or self._body[0] != key:
+            payload = build_payload(self.days, self.step, revision=self.revision)
+            self._body = (key, json.dumps(payload).encode())
+        return self._body[1]
+
+    async def start(self) -> str:
+        """Start the server on a free local port and return the API URL."""
+        app = web.Application()
+        app.router.add_get(API_PATH, self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # noqa: SLF001
+        self.url = f"http://127.0.0.1:{port}{API_PATH}"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if "access-token" not in request.query or "project" not in request.query:
+            return web.json_response({"status": -2}, status=401)
+        if self.mode == MODE_ERROR:
+            return web.Response(status=503, text="Service Unavailable")
+        if self.mode == MODE_RATE_LIMIT:
+            return web.Response(
+                status=429,
+                text="Too Many Requests",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        return web.Response(body=self.prepare(), content_type="application/json")
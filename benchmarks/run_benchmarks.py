@@ -0,0 +1,357 @@
+"""Benchmarks for the Solar Prediction integration.
+
+Runs a local stand-in for the solarprognose.de API and drives the
+coordinator and the sensors through the Home Assistant test harness.
+The results are written as JSON, so that runs of different versions can
+be compared.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/run_benchmarks.py --output bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+import gc
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+from unittest.mock import patch
+
+from aiohttp.resolver import ThreadedResolver
+from homeassistant import loader
+from homeassistant.const import CONF_ACCESS_TOKEN, __version__ as HA_VERSION
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import frame
+from homeassistant.helpers.storage import Store
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from fake_api import (
+    MODE_ERROR,
+    MODE_OK,
+    MODE_RATE_LIMIT,
+    FakeSolarPrognoseApi,
+    build_payload,
+)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DOMAIN = "solar_prediction"
+HORIZONS = (2, 7, 14)
+STEPS = (3600, 900)
+
+
+def _summary(samples: list[float]) -> dict[str, float]:
+    """Return summary statistics in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ms = sorted(sample * 1000 for sample in samples)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4),
+        "min_ms": round(ms[0], 4),
+    }
+
+
+class StoreCounter:
+    """Counts the Store reads and writes of the integration."""
+
+    def __init__(self) -> None:
+        self.loads = 0
+        self.writes = 0
+
+    @contextmanager
+    def count(self) -> Iterator[StoreCounter]:
+        original_load = Store.async_load
+        original_write = Store._async_handle_write_data  # noqa: SLF001
+        counter = self
+
+        async def _load(store: Store, *args: Any, **kwargs: Any) -> Any:
+            if store.key.startswith(DOMAIN):
+                counter.loads += 1
+            return await original_load(store, *args, **kwargs)
+
+        async def _write(store: Store, *args: Any, **kwargs: Any) -> Any:
+            if store.key.startswith(DOMAIN):
+                counter.writes += 1
+            return await original_write(store, *args, **kwargs)
+
+        with (
+            patch.object(Store, "async_load", _load),
+            patch.object(Store, "_async_handle_write_data", _write),
+        ):
+            yield self
+
+
+def _entry(hass: HomeAssistant, project: str) -> MockConfigEntry:
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=project,
+        data={CONF_ACCESS_TOKEN: "benchmark-token", "project": project},
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+async def bench_setup(
+    hass: HomeAssistant, api: FakeSolarPrognoseApi, rounds: int
+) -> list[dict[str, Any]]:
+    """Measure setup latency with and without a cache file."""
+    results = []
+    for cached in (False, True):
+        setup_times: list[float] = []
+        ready_times: list[float] = []
+        counter = StoreCounter()
+        requests_before = api.requests
+        with counter.count():
+            for i in range(rounds):
+                entry = _entry(hass, f"setup-{cached}-{i}")
+                if cached:
+                    await Store(hass, 1, f"{DOMAIN}_{entry.entry_id}").async_save(
+                        {"data": build_payload(api.days, api.step)}
+                    )
+                started = time.perf_counter()
+                assert await hass.config_entries.async_setup(entry.entry_id)
+                setup_times.append(time.perf_counter() - started)
+                # Die erste Aktualisierung läuft als Hintergrund-Task
+                await hass.async_block_till_done(wait_background_tasks=True)
+                assert entry.runtime_data.data is not None
+                ready_times.append(time.perf_counter() - started)
+                await hass.config_entries.async_unload(entry.entry_id)
+                await hass.async_block_till_done()
+        results.append(
+            {
+                "cached": cached,
+                "setup": _summary(setup_times),
+                "ready": _summary(ready_times),
+                "api_requests": api.requests - requests_before,
+                "store_loads": counter.loads,
+                "store_writes": counter.writes,
+            }
+        )
+    return results
+
+
+async def bench_refresh(
+    hass: HomeAssistant, api: FakeSolarPrognoseApi, rounds: int
+) -> list[dict[str, Any]]:
+    """Measure fetch, transform and sensor evaluation per horizon and step."""
+    from custom_components.solar_prediction.sensor import (  # noqa: PLC0415
+        SolarPredictionDailyTotalSensor,
+    )
+
+    results = []
+    for days in HORIZONS:
+        for step in STEPS:
+            api.days, api.step = days, step
+            entry = _entry(hass, f"refresh-{days}-{step}")
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done(wait_background_tasks=True)
+            coordinator = entry.runtime_data
+
+            cpu_changed: list[float] = []
+            cpu_unchanged: list[float] = []
+            counter = StoreCounter()
+            with counter.count():
+                for i in range(rounds):
+                    if i % 2 == 0:
+                        api.bump()
+                    # Die Antwort vorab erzeugen, damit die Messung nur die
+                    # Arbeit der Integration enthält
+                    api.prepare()
+                    coordinator.scheduler._recent.clear()  # noqa: SLF001
+                    started = time.process_time()
+                    await coordinator._async_update_data()  # noqa: SLF001
+                    elapsed = time.process_time() - started
+                    (cpu_changed if i % 2 == 0 else cpu_unchanged).append(elapsed)
+                await coordinator.cache.async_flush()
+
+            sensor = SolarPredictionDailyTotalSensor(coordinator, "today")
+            sensor.hass = hass
+            value_times = _time_calls(lambda: sensor.native_value, rounds * 10)
+            coordinator._apply_forecast(build_payload(days, step, revision=-1))  # noqa: SLF001
+            cold_attributes = _time_calls(lambda: sensor.extra_state_attributes, 1)
+            warm_attributes = _time_calls(
+                lambda: sensor.extra_state_attributes, rounds * 10
+            )
+
+            results.append(
+                {
+                    "days": days,
+                    "step_s": step,
+                    "samples": len(coordinator.forecast),
+                    "refresh_cpu_changed": _summary(cpu_changed),
+                    "refresh_cpu_unchanged": _summary(cpu_unchanged),
+                    "native_value": _summary(value_times),
+                    "attributes_cold": _summary(cold_attributes),
+                    "attributes_warm": _summary(warm_attributes),
+                    "store_loads": counter.loads,
+                    "store_writes": counter.writes,
+                    "update_stats": dict(coordinator.update_stats),
+                }
+            )
+            await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+    api.days, api.step = HORIZONS[0], STEPS[0]
+    return results
+
+
+async def bench_errors(
+    hass: HomeAssistant, api: FakeSolarPrognoseApi, rounds: int
+) -> list[dict[str, Any]]:
+    """Measure the cache fallback for 5xx and 429 answers."""
+    results = []
+    for mode in (MODE_ERROR, MODE_RATE_LIMIT):
+        entry = _entry(hass, f"errors-{mode}")
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done(wait_background_tasks=True)
+        coordinator = entry.runtime_data
+        api.mode = mode
+        fallback_times: list[float] = []
+        for _ in range(rounds):
+            coordinator.scheduler._recent.clear()  # noqa: SLF001
+            started = time.perf_counter()
+            await coordinator._async_update_data()  # noqa: SLF001
+            fallback_times.append(time.perf_counter() - started)
+        api.mode = MODE_OK
+        results.append(
+            {
+                "mode": mode,
+                "fallback": _summary(fallback_times),
+                "breaker_state": coordinator.breaker.state,
+                "next_attempt_in_s": round(
+                    coordinator.breaker.next_attempt.timestamp() - time.time()
+                )
+                if coordinator.breaker.next_attempt
+                else None,
+            }
+        )
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+    return results
+
+
+def bench_memory() -> list[dict[str, Any]]:
+    """Measure the memory of the parsed forecast model."""
+    from custom_components.solar_prediction.forecast import (  # noqa: PLC0415
+        SolarForecast,
+    )
+
+    results = []
+    for days in HORIZONS:
+        for step in STEPS:
+            forecast_data = build_payload(days, step)["data"]
+            gc.collect()
+            tracemalloc.start()
+            forecast = SolarForecast.from_api(forecast_data)
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append(
+                {
+                    "days": days,
+                    "step_s": step,
+                    "samples": len(forecast),
+                    "retained_bytes": retained,
+                    "peak_bytes": peak,
+                }
+            )
+    return results
+
+
+def _time_calls(func: Callable[[], Any], rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def async_main(args: argparse.Namespace) -> dict[str, Any]:
+    """Run all benchmarks and return the results."""
+    manifest = json.loads(
+        (REPO_ROOT / "custom_components" / DOMAIN / "manifest.json").read_text()
+    )
+    results: dict[str, Any] = {
+        "meta": {
+            "integration_version": manifest["version"],
+            "homeassistant_version": HA_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": args.rounds,
+            "timestamp": int(time.time()),
+        }
+    }
+
+    api = FakeSolarPrognoseApi(days=HORIZONS[0], step=STEPS[0])
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.symlink(REPO_ROOT / "custom_components", Path(config_dir, "custom_components"))
+        sys.path.insert(0, config_dir)
+        async with async_test_home_assistant(config_dir=config_dir) as hass:
+            hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+            frame.async_setup(hass)
+            # Der Recorder gehört nicht zur Messung, die Statistik-Importe laufen ins Leere
+            hass.config.components.add("recorder")
+            url = await api.start()
+            # Ohne network-Integration kann HA keinen Zeroconf-Resolver bauen
+            resolver = ThreadedResolver()
+            resolver.real_close = resolver.close
+            # Budget und Abstand des Schedulers würden die Messreihen ausbremsen
+            with (
+                patch("custom_components.solar_prediction.api.API_URL", url),
+                patch(
+                    "custom_components.solar_prediction.scheduler.TOKEN_DAILY_REQUEST_BUDGET",
+                    10**9,
+                ),
+                patch(
+                    "custom_components.solar_prediction.scheduler.MIN_REQUEST_SPACING",
+                    0,
+                ),
+                patch(
+                    "custom_components.solar_prediction.statistics.async_add_external_statistics"
+                ),
+                patch(
+                    "homeassistant.helpers.aiohttp_client._async_make_resolver",
+                    return_value=resolver,
+                ),
+            ):
+                results["setup"] = await bench_setup(hass, api, args.rounds)
+                results["refresh"] = await bench_refresh(hass, api, args.rounds)
+                results["errors"] = await bench_errors(hass, api, args.rounds)
+                results["memory"] = bench_memory()
+            await api.stop()
+            await hass.async_stop(force=True)
+    return results
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20, help="Rounds per measurement")
+    parser.add_argument("--output", type=Path, help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = asyncio.run(async_main(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -2,73 +2,167 @@
 
 from __future__ import annotations
 import logging
+import time
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform, CONF_ACCESS_TOKEN
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.storage import Store
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.typing import ConfigType
 from homeassistant.util import dt as dt_util
 
-from .const import CONF_PROJECT
+from .aggregate import SolarPredictionAggregateCoordinator
+from .archive import async_remove_archive
+from .bias import async_remove_bias
+from .cache import async_pop_seed
+from .const import (
+    CONF_ENTRY_TYPE,
+    CONF_MEMBERS,
+    CONF_PROJECT,
+    DOMAIN,
+    ENTRY_TYPE_AGGREGATE,
+    SIGNAL_MEMBER_UPDATED,
+)
 from .coordinator import SolarPredictionDataUpdateCoordinator
+from .services import async_setup_services
+from .statistics import async_remove_statistics_state
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
-type SolarPredictionConfigEntry = ConfigEntry[SolarPredictionDataUpdateCoordinator]
+type SolarPredictionConfigEntry = ConfigEntry[
+    SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator
+]
 _LOGGER = logging.getLogger(__name__)
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Solar Prediction services."""
+    async_setup_services(hass)
+    return True
+
+
+def is_aggregate(entry: ConfigEntry) -> bool:
+    """Return True if the entry combines other entries instead of a project."""
+    return entry.data.get(CONF_ENTRY_TYPE) == ENTRY_TYPE_AGGREGATE
 
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: SolarPredictionConfigEntry
 ) -> bool:
     """Set up Solar Prediction from a config entry."""
+    if is_aggregate(entry):
+        return await _async_setup_aggregate(hass, entry)
+    setup_started = time.perf_counter()
     access_token = entry.data[CONF_ACCESS_TOKEN]
     project = entry.data[CONF_PROJECT]
 
-    # Manuelle Instanz des Speichers, um den Cache vorab zu prüfen
-    store = Store(hass, 1, f"solar_prediction_{entry.entry_id}")
-
     # Erstellen Sie die Koordinator-Instanz
     coordinator = SolarPredictionDataUpdateCoordinator(
-        hass, access_token, project, entry.entry_id
+        hass, access_token, project, entry.entry_id, entry.options
     )
+    entry.async_on_unload(coordinator.async_register_scheduler())
+
+    # Die Antwort der Validierung im Config Flow erspart die erste Anfrage
+    if (seed := async_pop_seed(hass, access_token, project)) is not None:
+        coordinator.cache.async_set(seed, coordinator.api_type)
 
-    # Prüfen, ob gültige, gecachte Daten vorhanden sind
-    cached_data_wrapper = await store.async_load()
-    initial_data_loaded_from_cache = False
-    if cached_data_wrapper and "data" in cached_data_wrapper:
-        cached_api_response = cached_data_wrapper["data"]
+    # Cache-Daten sofort übernehmen, auch wenn sie abgelaufen sind
+    initial_refresh_needed = True
+    if cached_api_response := await coordinator.cache.async_load():
+        coordinator.async_set_updated_data(cached_api_response)
         try:
             next_request_epoch = cached_api_response["preferredNextApiRequestAt"][
                 "epochTimeUtc"
             ]
-            now_epoch = int(dt_util.utcnow().timestamp())
-
-            if now_epoch < next_request_epoch:
-                _LOGGER.info(
-                    "Startup: Gültige Cache-Daten gefunden. Überspringe ersten API-Aufruf."
-                )
-                # Setzen Sie die Daten des Koordinators manuell aus dem Cache
-                coordinator.async_set_updated_data(cached_api_response)
-                initial_data_loaded_from_cache = True
+            initial_refresh_needed = (
+                int(dt_util.utcnow().timestamp()) >= next_request_epoch
+                or not coordinator.cache_is_current
+            )
         except (KeyError, TypeError):
             _LOGGER.warning(
                 "Startup: Cache-Daten sind fehlerhaft. Erzwinge API-Aktualisierung."
             )
+        coordinator.stale = initial_refresh_needed
+
+    if coordinator.bias is not None:
+        await coordinator.bias.async_load()
+        entry.async_on_unload(coordinator.async_track_production())
+
+    entry.runtime_data = coordinator
+    entry.async_on_unload(coordinator.async_track_day_rollover())
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # Zusammenfassende Einträge hängen sich an den neuen Koordinator
+    async_dispatcher_send(hass, SIGNAL_MEMBER_UPDATED, entry.entry_id, coordinator)
 
-    # Nur wenn keine gültigen Cache-Daten geladen wurden, eine neue Anfrage stellen
-    if not initial_data_loaded_from_cache:
+    # Die API-Anfrage blockiert den Start von Home Assistant nicht
+    if initial_refresh_needed:
         _LOGGER.info(
-            "Startup: Kein gültiger Cache gefunden. Führe erste API-Aktualisierung durch."
+            "Startup: Kein gültiger Cache gefunden. Aktualisiere im Hintergrund."
+        )
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} initial refresh {project}"
         )
-        await coordinator.async_config_entry_first_refresh()
+    coordinator.setup_duration = time.perf_counter() - setup_started
+    _LOGGER.debug(
+        "Startup: Setup of %s took %.3f s", project, coordinator.setup_duration
+    )
+    return True
+
 
+async def _async_setup_aggregate(
+    hass: HomeAssistant, entry: SolarPredictionConfigEntry
+) -> bool:
+    """Set up a virtual device that combines several project entries."""
+    coordinator = SolarPredictionAggregateCoordinator(
+        hass, entry.title, entry.entry_id, entry.data[CONF_MEMBERS]
+    )
     entry.runtime_data = coordinator
+    entry.async_on_unload(coordinator.async_start())
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
+async def _async_update_listener(
+    hass: HomeAssistant, entry: SolarPredictionConfigEntry
+) -> None:
+    """Apply a new access token in place, reload for anything else."""
+    coordinator = entry.runtime_data
+    if not is_aggregate(entry) and (
+        entry.data[CONF_PROJECT] == coordinator.project
+        and dict(entry.options) == coordinator.options
+    ):
+        access_token = entry.data[CONF_ACCESS_TOKEN]
+        seed = async_pop_seed(hass, access_token, coordinator.project)
+        if access_token != coordinator.access_token or seed is not None:
+            coordinator.async_update_access_token(access_token, seed)
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(
     hass: HomeAssistant, entry: SolarPredictionConfigEntry
 ) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if is_aggregate(entry):
+        return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        async_dispatcher_send(hass, SIGNAL_MEMBER_UPDATED, entry.entry_id, None)
+        await entry.runtime_data.cache.async_flush()
+        await entry.runtime_data.archive.async_close()
+        if entry.runtime_data.bias is not None:
+            await entry.runtime_data.bias.async_flush()
+    return unload_ok
+
+
+async def async_remove_entry(
+    hass: HomeAssistant, entry: SolarPredictionConfigEntry
+) -> None:
+    """Remove the files kept for a deleted config entry."""
+    if is_aggregate(entry):
+        return
+    await async_remove_archive(hass, entry.entry_id)
+    await async_remove_bias(hass, entry.entry_id)
+    await async_remove_statistics_state(hass, entry.entry_id)
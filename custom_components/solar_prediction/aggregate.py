@@ -0,0 +1,162 @@
+"""Aggregate coordinator combining several Solar Prediction projects."""
+
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import event
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .const import DOMAIN, SIGNAL_MEMBER_UPDATED
+from .coordinator import SolarPredictionDataUpdateCoordinator
+from .forecast import SolarForecast
+from .metrics import SolarPredictionMetrics
+from .timeline import ForecastTimeline
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SolarPredictionAggregateCoordinator(DataUpdateCoordinator[dict[str, int | None]]):
+    """Merges the forecasts of several project entries into one site forecast.
+
+    The aggregate makes no API requests. It listens to the coordinators of
+    its members and rebuilds the merged forecast only when the fingerprint
+    of a member forecast changed; status-only updates of a member are
+    ignored. Members that are not loaded are left out until they are.
+    ``data`` maps the entry ids of the merged members to their fingerprint.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        name: str,
+        config_entry_id: str,
+        member_ids: list[str],
+    ) -> None:
+        # Schlüssel für Gerät und unique_ids, der Name lässt sich ändern
+        self.project = f"aggregate_{config_entry_id}"
+        self.title = name
+        self.config_entry_id = config_entry_id
+        self.member_ids = list(member_ids)
+        self.metrics = SolarPredictionMetrics(False)
+        self.forecast = SolarForecast.from_api(None)
+        self.timeline = ForecastTimeline(self.forecast)
+        self.update_stats = {"applied": 0, "skipped": 0}
+        # Ohne API gibt es weder Korrektur noch Archiv
+        self.bias = None
+        self.archive = None
+        self._members: dict[str, SolarPredictionDataUpdateCoordinator] = {}
+        self._unsub_members: dict[str, CALLBACK_TYPE] = {}
+        super().__init__(hass, _LOGGER, name=f"{DOMAIN} {name}", update_interval=None)
+
+    @property
+    def corrected_forecast(self) -> SolarForecast:
+        """Return the merged forecast, the aggregate learns no correction."""
+        return self.forecast
+
+    @property
+    def members(self) -> dict[str, SolarPredictionDataUpdateCoordinator]:
+        """Return the coordinators of the loaded members."""
+        return self._members
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Attach the loaded members and follow members that are set up later."""
+        for entry_id in self.member_ids:
+            entry = self.hass.config_entries.async_get_entry(entry_id)
+            coordinator = getattr(entry, "runtime_data", None)
+            if isinstance(coordinator, SolarPredictionDataUpdateCoordinator):
+                self._async_attach(entry_id, coordinator)
+        self._async_merge()
+        unsub_signal = async_dispatcher_connect(
+            self.hass, SIGNAL_MEMBER_UPDATED, self._async_handle_member_changed
+        )
+        unsub_rollover = event.async_track_time_change(
+            self.hass, self._async_handle_day_rollover, hour=0, minute=0, second=0
+        )
+
+        @callback
+        def _stop() -> None:
+            unsub_signal()
+            unsub_rollover()
+            for unsub in self._unsub_members.values():
+                unsub()
+            self._unsub_members.clear()
+            self._members.clear()
+
+        return _stop
+
+    @callback
+    def _async_attach(
+        self, entry_id: str, coordinator: SolarPredictionDataUpdateCoordinator
+    ) -> None:
+        if unsub := self._unsub_members.pop(entry_id, None):
+            unsub()
+        self._members[entry_id] = coordinator
+        self._unsub_members[entry_id] = coordinator.async_add_listener(
+            self._async_handle_member_update
+        )
+
+    @callback
+    def _async_handle_member_changed(
+        self, entry_id: str, coordinator: SolarPredictionDataUpdateCoordinator | None
+    ) -> None:
+        """Attach a member that was set up or drop one that was unloaded."""
+        if entry_id not in self.member_ids:
+            return
+        if coordinator is not None:
+            self._async_attach(entry_id, coordinator)
+        else:
+            if unsub := self._unsub_members.pop(entry_id, None):
+                unsub()
+            self._members.pop(entry_id, None)
+        self._async_merge()
+
+    @callback
+    def _async_handle_member_update(self) -> None:
+        self._async_merge()
+
+    async def _async_update_data(self) -> dict[str, int | None]:
+        """Merge on a requested refresh, there is nothing to fetch."""
+        fingerprints = self._fingerprints()
+        if fingerprints != self.data:
+            self._rebuild(fingerprints)
+        return fingerprints
+
+    def _fingerprints(self) -> dict[str, int | None]:
+        return {
+            entry_id: self._members[entry_id].forecast.fingerprint
+            for entry_id in self.member_ids
+            if entry_id in self._members
+        }
+
+    @callback
+    def _async_merge(self) -> None:
+        """Rebuild the merged forecast if a member forecast changed."""
+        fingerprints = self._fingerprints()
+        if fingerprints == self.data:
+            self.update_stats["skipped"] += 1
+            return
+        self._rebuild(fingerprints)
+        self.async_set_updated_data(fingerprints)
+
+    def _rebuild(self, fingerprints: dict[str, int | None]) -> None:
+        with self.metrics.timer("merge"):
+            self.forecast = SolarForecast.merged(
+                [self._members[entry_id].forecast for entry_id in fingerprints]
+            )
+            self.timeline = ForecastTimeline(self.forecast)
+        self.update_stats["applied"] += 1
+        _LOGGER.debug(
+            "Merged %s member forecasts of %s into %s samples",
+            len(fingerprints),
+            self.title,
+            len(self.forecast),
+        )
+
+    @callback
+    def _async_handle_day_rollover(self, _now) -> None:
+        self.forecast.build_day_index()
+        self.async_update_listeners()
@@ -0,0 +1,30 @@
+"""Client for the solarprognose.de API."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from aiohttp import ClientSession
+
+from homeassistant.util.json import json_loads
+
+from .metrics import SolarPredictionMetrics
+
+API_URL = "https://solarprognose.de/web/solarprediction/api/v1"
+
+_DISABLED_METRICS = SolarPredictionMetrics()
+
+
+async def async_fetch_forecast(
+    session: ClientSession,
+    params: dict[str, str],
+    metrics: SolarPredictionMetrics | None = None,
+) -> dict[str, Any]:
+    """Request a forecast and return the decoded JSON response."""
+    metrics = metrics or _DISABLED_METRICS
+    with metrics.timer("http"):
+        async with session.get(API_URL, params=params) as response:
+            response.raise_for_status()
+            body = await response.read()
+    with metrics.timer("json_decode"):
+        return json_loads(body)
@@ -0,0 +1,269 @@
+"""Forecast history archive for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+import asyncio
+from array import array
+from bisect import bisect_left, bisect_right
+import logging
+import mmap
+import os
+from pathlib import Path
+import struct
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .forecast import SolarForecast, interpolate_cumulative
+from .metrics import SolarPredictionMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b"SPFA"
+ARCHIVE_VERSION = 1
+# Dateikopf: Kennung, Version, reserviert
+FILE_HEADER = struct.Struct("<4sHH")
+# Revisionskopf: Ausgabezeitpunkt (Epoch UTC), Anzahl der Stützstellen
+REVISION_HEADER = struct.Struct("<qq")
+# Je Stützstelle drei 8-Byte-Spalten: Epoch, Leistung (kW), kumulative kWh
+COLUMN_WIDTH = 8
+
+
+def archive_path(hass: HomeAssistant, config_entry_id: str) -> Path:
+    """Return the path of the archive file of a config entry."""
+    return Path(hass.config.path(".storage", f"{DOMAIN}_{config_entry_id}.archive"))
+
+
+async def async_remove_archive(hass: HomeAssistant, config_entry_id: str) -> None:
+    """Delete the archive file of a removed config entry."""
+    await hass.async_add_executor_job(
+        archive_path(hass, config_entry_id).unlink, True
+    )
+
+
+class SolarForecastArchive:
+    """Append-only binary archive of every applied forecast revision.
+
+    Each revision is stored as a header followed by three columns (epochs as
+    int64, power and cumulative energy as float64), so a revision can be
+    read straight from a memory map without parsing. The revision offsets
+    are kept in memory; they are rebuilt from the headers when the file is
+    opened. Revisions older than the retention are dropped by rewriting the
+    file, which happens at most once a day.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry_id: str,
+        retention_days: int,
+        metrics: SolarPredictionMetrics,
+    ) -> None:
+        self._hass = hass
+        self._metrics = metrics
+        self.path = archive_path(hass, config_entry_id)
+        self.retention = retention_days * 86400
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self._issued = array("q")
+        self._offsets = array("q")
+        self._counts = array("q")
+        self._size = 0
+        self._map: mmap.mmap | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if revisions are archived."""
+        return self.retention > 0
+
+    @property
+    def revisions(self) -> int:
+        """Return the number of archived revisions."""
+        return len(self._issued)
+
+    @property
+    def size(self) -> int:
+        """Return the size of the archive file in bytes."""
+        return self._size
+
+    async def async_load(self) -> None:
+        """Build the revision index from the archive file."""
+        async with self._lock:
+            if not self._loaded:
+                await self._hass.async_add_executor_job(self._load)
+
+    async def async_append(self, issued_at: int, forecast: SolarForecast) -> None:
+        """Append one forecast revision."""
+        if not self.enabled or not len(forecast):
+            return
+        async with self._lock:
+            if not self._loaded:
+                await self._hass.async_add_executor_job(self._load)
+            with self._metrics.timer("archive_append"):
+                await self._hass.async_add_executor_job(
+                    self._append, issued_at, forecast
+                )
+            self._metrics.increment("archive_revisions")
+
+    async def async_compact(self) -> None:
+        """Drop the revisions that are older than the retention."""
+        async with self._lock:
+            if not self._loaded:
+                await self._hass.async_add_executor_job(self._load)
+            cutoff = int(dt_util.utcnow().timestamp()) - self.retention
+            if not self._issued or self._issued[0] >= cutoff:
+                return
+            with self._metrics.timer("archive_compact"):
+                await self._hass.async_add_executor_job(self._compact, cutoff)
+
+    async def async_lookup(
+        self, target: int, lead_time: int
+    ) -> dict[str, Any] | None:
+        """Return the forecast for ``target`` as issued ``lead_time`` seconds ahead."""
+        async with self._lock:
+            if not self._loaded:
+                await self._hass.async_add_executor_job(self._load)
+            return await self._hass.async_add_executor_job(
+                self._lookup, target, lead_time
+            )
+
+    async def async_close(self) -> None:
+        """Release the memory map."""
+        async with self._lock:
+            if self._map is not None:
+                await self._hass.async_add_executor_job(self._map.close)
+                self._map = None
+
+    def _load(self) -> None:
+        self._loaded = True
+        self._issued, self._offsets, self._counts = array("q"), array("q"), array("q")
+        self._size = 0
+        unknown = False
+        try:
+            with self.path.open("rb") as file:
+                file_size = os.fstat(file.fileno()).st_size
+                header = file.read(FILE_HEADER.size)
+                if len(header) < FILE_HEADER.size:
+                    # Leer oder beim Anlegen abgebrochen, sonst eine fremde Datei
+                    unknown = not ARCHIVE_MAGIC.startswith(header[: len(ARCHIVE_MAGIC)])
+                elif FILE_HEADER.unpack(header)[:2] != (ARCHIVE_MAGIC, ARCHIVE_VERSION):
+                    unknown = True
+                else:
+                    offset = FILE_HEADER.size
+                    # Nur die Revisionsköpfe lesen, die Spalten werden übersprungen
+                    while offset + REVISION_HEADER.size <= file_size:
+                        file.seek(offset)
+                        issued_at, count = REVISION_HEADER.unpack(
+                            file.read(REVISION_HEADER.size)
+                        )
+                        end = offset + REVISION_HEADER.size + 3 * COLUMN_WIDTH * count
+                        if count <= 0 or end > file_size:
+                            break
+                        self._issued.append(issued_at)
+                        self._offsets.append(offset + REVISION_HEADER.size)
+                        self._counts.append(count)
+                        offset = end
+                    self._size = offset
+        except FileNotFoundError:
+            return
+        if unknown:
+            # Fremde oder neuere Datei nicht überschreiben, sondern beiseitelegen
+            aside = self.path.with_name(f"{self.path.name}.unknown")
+            _LOGGER.warning(
+                "Moving unknown forecast archive %s to %s", self.path, aside
+            )
+            os.replace(self.path, aside)
+            return
+        if self._size < file_size:
+            # Abgebrochener Schreibvorgang, unvollständige Daten abschneiden
+            _LOGGER.debug("Truncating partial revision in %s", self.path)
+            os.truncate(self.path, self._size)
+
+    def _append(self, issued_at: int, forecast: SolarForecast) -> None:
+        if self._issued and issued_at < self._issued[-1]:
+            issued_at = self._issued[-1]
+        count = len(forecast)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as file:
+            if self._size == 0:
+                file.truncate(0)
+                file.write(FILE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0))
+                self._size = FILE_HEADER.size
+            file.write(REVISION_HEADER.pack(issued_at, count))
+            file.write(forecast.epochs.tobytes())
+            file.write(forecast.power.tobytes())
+            file.write(forecast.cumulative.tobytes())
+        self._issued.append(issued_at)
+        self._offsets.append(self._size + REVISION_HEADER.size)
+        self._counts.append(count)
+        self._size += REVISION_HEADER.size + 3 * COLUMN_WIDTH * count
+
+    def _compact(self, cutoff: int) -> None:
+        keep = bisect_left(self._issued, cutoff)
+        source = self._mapped()
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("wb") as file:
+            file.write(FILE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0))
+            if keep < len(self._offsets):
+                with memoryview(source) as view:
+                    file.write(
+                        view[self._offsets[keep] - REVISION_HEADER.size : self._size]
+                    )
+            file.flush()
+            os.fsync(file.fileno())
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        os.replace(tmp_path, self.path)
+        _LOGGER.debug("Dropped %s archived forecast revisions", keep)
+        self._load()
+
+    def _mapped(self) -> mmap.mmap:
+        # Nach dem Anhängen ist die Datei länger als die bestehende Abbildung
+        if self._map is None or len(self._map) < self._size:
+            if self._map is not None:
+                self._map.close()
+            with self.path.open("rb") as file:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _lookup(self, target: int, lead_time: int) -> dict[str, Any] | None:
+        # Jüngste Revision, die mindestens lead_time vor dem Ziel ausgegeben wurde
+        revision = bisect_right(self._issued, target - lead_time) - 1
+        if revision < 0:
+            return None
+        offset, count = self._offsets[revision], self._counts[revision]
+        view = memoryview(self._mapped())
+        width = COLUMN_WIDTH * count
+        epochs = view[offset : offset + width].cast("q")
+        power = view[offset + width : offset + 2 * width].cast("d")
+        cumulative = view[offset + 2 * width : offset + 3 * width].cast("d")
+        try:
+            if not count or not epochs[0] <= target <= epochs[-1]:
+                return None
+            index = bisect_left(epochs, target)
+            if epochs[index] == target:
+                power_at = power[index]
+            else:
+                left, right = epochs[index - 1], epochs[index]
+                power_at = power[index - 1] + (power[index] - power[index - 1]) * (
+                    target - left
+                ) / (right - left)
+            # Energie der Stunde bis zum Ziel, unabhängig von der Auflösung
+            hourly = interpolate_cumulative(
+                epochs, power, cumulative, target
+            ) - interpolate_cumulative(epochs, power, cumulative, target - 3600)
+            issued_at = self._issued[revision]
+            return {
+                "issued_at": dt_util.utc_from_timestamp(issued_at).isoformat(),
+                "lead_time_hours": round((target - issued_at) / 3600, 2),
+                "power_kw": round(power_at, 3),
+                "hourly_kwh": round(hourly, 3),
+            }
+        finally:
+            epochs.release()
+            power.release()
+            cumulative.release()
+            view.release()
@@ -0,0 +1,230 @@
+"""Bias correction against a production sensor for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from array import array
+from datetime import datetime
+import logging
+from typing import Any
+
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    UnitOfEnergy,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from homeassistant.util.unit_conversion import EnergyConverter
+
+from .const import DOMAIN
+from .forecast import SolarForecast
+
+_LOGGER = logging.getLogger(__name__)
+BIAS_VERSION = 1
+SAVE_DELAY = 300
+# Gewicht früherer Tage je neuem Wert einer Tagesstunde (~1 Monat Gedächtnis)
+HOUR_DECAY = 0.97
+# Gewicht des Vorjahres, wenn ein Monat erneut beginnt
+MONTH_DECAY = 0.5
+# Vorwissen in kWh, zieht Faktoren mit wenig Daten Richtung 1
+PRIOR_KWH = 1.0
+MIN_FORECAST_KWH = 0.01
+MIN_FACTOR = 0.2
+MAX_FACTOR = 5.0
+
+
+async def async_remove_bias(hass: HomeAssistant, config_entry_id: str) -> None:
+    """Delete the learned statistics of a removed config entry."""
+    await Store(hass, BIAS_VERSION, f"{DOMAIN}_{config_entry_id}_bias").async_remove()
+
+
+class BiasCorrection:
+    """Learns correction factors from the measured production.
+
+    At every full hour the energy measured by the production sensor during
+    the past hour is compared with the forecast for that hour. Decayed sums
+    of measured and predicted energy are kept per local hour of day and per
+    month, so each completed hour is a constant-time update and no recorder
+    history is read. The factor of an hour combines both as
+    ``hour * month / overall``.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry_id: str,
+        entity_id: str,
+    ) -> None:
+        self.hass = hass
+        self.entity_id = entity_id
+        self._corrected: SolarForecast | None = None
+        self._corrected_from: tuple[SolarForecast, int] | None = None
+        self._store: Store[dict[str, Any]] = Store(
+            hass, BIAS_VERSION, f"{DOMAIN}_{config_entry_id}_bias"
+        )
+        self.hour_actual = array("d", bytes(8 * 24))
+        self.hour_forecast = array("d", bytes(8 * 24))
+        self.month_actual = array("d", bytes(8 * 12))
+        self.month_forecast = array("d", bytes(8 * 12))
+        self.month_year = array("q", bytes(8 * 12))
+        self.samples = 0
+        self._last_hour: int | None = None
+        self._last_reading: float | None = None
+        self._dirty = False
+
+    async def async_load(self) -> None:
+        """Restore the learned statistics."""
+        stored = await self._store.async_load()
+        if not stored:
+            return
+        try:
+            hour_actual = array("d", stored["hour_actual"])
+            hour_forecast = array("d", stored["hour_forecast"])
+            month_actual = array("d", stored["month_actual"])
+            month_forecast = array("d", stored["month_forecast"])
+            month_year = array("q", stored["month_year"])
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.warning("Discarding malformed bias statistics")
+            return
+        if len(hour_actual) != 24 or len(month_actual) != 12:
+            return
+        self.hour_actual, self.hour_forecast = hour_actual, hour_forecast
+        self.month_actual, self.month_forecast = month_actual, month_forecast
+        self.month_year = month_year
+        self.samples = stored.get("samples", 0)
+        self._last_hour = stored.get("last_hour")
+        self._last_reading = stored.get("last_reading")
+
+    async def async_flush(self) -> None:
+        """Write pending statistics immediately."""
+        if self._dirty:
+            await self._store.async_save(self._data_to_save())
+
+    def corrected(self, raw: SolarForecast) -> SolarForecast:
+        """Return the corrected forecast, rebuilt only when something changed."""
+        source = self._corrected_from
+        if (
+            self._corrected is None
+            or source is None
+            or source[0] is not raw
+            or source[1] != self.samples
+        ):
+            factors = array("d", bytes(8 * len(raw)))
+            cache: dict[tuple[int, int], float] = {}
+            for i, epoch in enumerate(raw.epochs):
+                local = dt_util.as_local(dt_util.utc_from_timestamp(epoch))
+                slot = (local.hour, local.month)
+                if (factor := cache.get(slot)) is None:
+                    factor = cache[slot] = self.factor(*slot)
+                factors[i] = factor
+            self._corrected = raw.scaled(factors)
+            self._corrected_from = (raw, self.samples)
+        return self._corrected
+
+    def factor(self, hour: int, month: int) -> float:
+        """Return the correction factor of a local hour and month."""
+        hour_factor = (self.hour_actual[hour] + PRIOR_KWH) / (
+            self.hour_forecast[hour] + PRIOR_KWH
+        )
+        month_factor = (self.month_actual[month - 1] + PRIOR_KWH) / (
+            self.month_forecast[month - 1] + PRIOR_KWH
+        )
+        overall = (sum(self.month_actual) + PRIOR_KWH) / (
+            sum(self.month_forecast) + PRIOR_KWH
+        )
+        factor = hour_factor * month_factor / overall
+        return min(MAX_FACTOR, max(MIN_FACTOR, factor))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the current factors as a serializable dict."""
+        month = dt_util.now().month
+        return {
+            "entity_id": self.entity_id,
+            "samples": self.samples,
+            "hour_factors": [round(self.factor(h, month), 3) for h in range(24)],
+            "month_factors": [
+                round(
+                    (self.month_actual[m] + PRIOR_KWH)
+                    / (self.month_forecast[m] + PRIOR_KWH),
+                    3,
+                )
+                for m in range(12)
+            ],
+        }
+
+    @callback
+    def async_add_hour(self, now: datetime, forecast: SolarForecast) -> bool:
+        """Compare the past hour with the forecast, return True if learned."""
+        hour_end = int(
+            dt_util.as_local(now).replace(minute=0, second=0, microsecond=0).timestamp()
+        )
+        reading = self._read_sensor()
+        last_hour, last_reading = self._last_hour, self._last_reading
+        self._last_hour, self._last_reading = hour_end, reading
+        self._schedule_save()
+        # Ohne lückenlosen Zählerstand der letzten Stunde wird nur neu begonnen
+        if reading is None or last_reading is None or last_hour != hour_end - 3600:
+            return False
+        actual = reading - last_reading
+        if actual < 0:
+            # Zähler wurde zurückgesetzt
+            return False
+        predicted = forecast.energy_between(hour_end - 3600, hour_end)
+        if predicted < MIN_FORECAST_KWH and actual < MIN_FORECAST_KWH:
+            return False
+        start = dt_util.as_local(dt_util.utc_from_timestamp(hour_end - 3600))
+        self._add_sample(start.hour, start.month, start.year, actual, predicted)
+        return True
+
+    def _add_sample(
+        self, hour: int, month: int, year: int, actual: float, predicted: float
+    ) -> None:
+        self.hour_actual[hour] = self.hour_actual[hour] * HOUR_DECAY + actual
+        self.hour_forecast[hour] = self.hour_forecast[hour] * HOUR_DECAY + predicted
+        index = month - 1
+        if self.month_year[index] != year:
+            # Ein neuer Durchgang des Monats, das Vorjahr zählt nur noch halb
+            self.month_actual[index] *= MONTH_DECAY
+            self.month_forecast[index] *= MONTH_DECAY
+            self.month_year[index] = year
+        self.month_actual[index] += actual
+        self.month_forecast[index] += predicted
+        self.samples += 1
+
+    def _read_sensor(self) -> float | None:
+        """Return the production counter in kWh."""
+        state = self.hass.states.get(self.entity_id)
+        if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            return None
+        try:
+            value = float(state.state)
+        except ValueError:
+            return None
+        unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+        if unit == UnitOfEnergy.KILO_WATT_HOUR:
+            return value
+        if unit not in EnergyConverter.VALID_UNITS:
+            _LOGGER.debug("Unsupported unit %s of %s", unit, self.entity_id)
+            return None
+        return EnergyConverter.convert(value, unit, UnitOfEnergy.KILO_WATT_HOUR)
+
+    @callback
+    def _schedule_save(self) -> None:
+        self._dirty = True
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        self._dirty = False
+        return {
+            "hour_actual": [round(v, 4) for v in self.hour_actual],
+            "hour_forecast": [round(v, 4) for v in self.hour_forecast],
+            "month_actual": [round(v, 4) for v in self.month_actual],
+            "month_forecast": [round(v, 4) for v in self.month_forecast],
+            "month_year": list(self.month_year),
+            "samples": self.samples,
+            "last_hour": self._last_hour,
+            "last_reading": self._last_reading,
+        }
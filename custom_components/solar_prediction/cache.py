@@ -0,0 +1,131 @@
+"""Write-through cache for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.json import json_bytes
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_SEEDS, DEFAULT_RESOLUTION, DOMAIN
+from .forecast import forecast_fingerprint
+from .metrics import SolarPredictionMetrics
+
+_LOGGER = logging.getLogger(__name__)
+CACHE_VERSION = 1
+SAVE_DELAY = 30
+
+
+def _payload_hash(data: dict[str, Any], fingerprint: int | None = None) -> int:
+    """Return a hash over a whole API response."""
+    if fingerprint is None:
+        fingerprint = forecast_fingerprint(data.get("data"))
+    # Nur die kleinen übrigen Felder (z. B. nächster Abfragezeitpunkt) serialisieren
+    rest = {key: value for key, value in data.items() if key != "data"}
+    return hash((fingerprint, json_bytes(rest)))
+
+
+@callback
+def async_stash_seed(
+    hass: HomeAssistant, access_token: str, project: str, data: dict[str, Any]
+) -> None:
+    """Keep an API response of the config flow for the entry that follows."""
+    seeds = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SEEDS, {})
+    seeds[(access_token, project)] = data
+
+
+@callback
+def async_pop_seed(
+    hass: HomeAssistant, access_token: str, project: str
+) -> dict[str, Any] | None:
+    """Return and forget the config flow response for these credentials."""
+    seeds = hass.data.get(DOMAIN, {}).get(DATA_SEEDS)
+    if not seeds:
+        return None
+    return seeds.pop((access_token, project), None)
+
+
+class SolarPredictionCache:
+    """Keeps the last API response in memory and on disk.
+
+    The file is read at most once. Writes are skipped when the payload did
+    not change and are otherwise batched with a delayed save. The request
+    type (resolution) is stored with the response, so a changed resolution
+    is detected after a restart.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry_id: str,
+        metrics: SolarPredictionMetrics,
+    ) -> None:
+        self._metrics = metrics
+        self._store: Store[dict[str, Any]] = Store(
+            hass, CACHE_VERSION, f"{DOMAIN}_{config_entry_id}"
+        )
+        self._loaded = False
+        self._data: dict[str, Any] | None = None
+        self.request_type = DEFAULT_RESOLUTION
+        self._hash: int | None = None
+        self._dirty = False
+
+    @property
+    def data(self) -> dict[str, Any] | None:
+        """Return the cached API response."""
+        return self._data
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Load the cache file on first use and return the cached API response."""
+        if not self._loaded:
+            self._loaded = True
+            with self._metrics.timer("store_load"):
+                stored = await self._store.async_load()
+            if stored and isinstance(stored.get("data"), dict):
+                self._data = stored["data"]
+                self.request_type = stored.get("type", DEFAULT_RESOLUTION)
+                self._hash = _payload_hash(self._data)
+                _LOGGER.debug("Loaded cached forecast from %s", self._store.path)
+        return self._data
+
+    @callback
+    def async_set(
+        self,
+        data: dict[str, Any],
+        request_type: str = DEFAULT_RESOLUTION,
+        fingerprint: int | None = None,
+    ) -> bool:
+        """Update the cache, return False if the payload was unchanged.
+
+        ``fingerprint`` is the forecast fingerprint of ``data`` if the caller
+        already computed it, so the forecast is not serialised twice.
+        """
+        payload_hash = _payload_hash(data, fingerprint)
+        self._loaded = True
+        self._data = data
+        if payload_hash == self._hash and request_type == self.request_type:
+            self._metrics.increment("skipped_saves")
+            return False
+        self._hash = payload_hash
+        self.request_type = request_type
+        self._dirty = True
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        return True
+
+    async def async_flush(self) -> None:
+        """Write a pending delayed save immediately.
+
+        Only this write is timed (``store_flush``). The delayed saves run
+        inside the Store and are counted by ``store_writes`` only.
+        """
+        if self._dirty:
+            with self._metrics.timer("store_flush"):
+                await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        self._dirty = False
+        self._metrics.increment("store_writes")
+        return {"data": self._data, "type": self.request_type}
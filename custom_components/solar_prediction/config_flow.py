@@ -2,20 +2,56 @@
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 import logging
 from typing import Any
 
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
 
-# Wir brauchen aiohttp, um die API-Anfrage zu stellen
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.core import HomeAssistant
+from aiohttp.client_exceptions import ClientResponseError
+from homeassistant.helpers.selector import (
+    EntitySelector,
+    EntitySelectorConfig,
+    SelectOptionDict,
+    SelectSelector,
+    SelectSelectorConfig,
+)
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.const import CONF_NAME
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 
 # Wir importieren unsere Konstanten
-from .const import DOMAIN, CONF_PROJECT
+from .const import (
+    DOMAIN,
+    CONF_PROJECT,
+    CONF_ARCHIVE_RETENTION,
+    CONF_ENTRY_TYPE,
+    CONF_INSTRUMENTATION,
+    CONF_MAX_REQUESTS_PER_DAY,
+    CONF_MEMBERS,
+    CONF_NIGHT_PAUSE,
+    CONF_PRODUCTION_SENSOR,
+    CONF_RESOLUTION,
+    CONF_SUNRISE_LEAD_TIME,
+    DEFAULT_ARCHIVE_RETENTION,
+    DEFAULT_INSTRUMENTATION,
+    DEFAULT_MAX_REQUESTS_PER_DAY,
+    DEFAULT_NIGHT_PAUSE,
+    DEFAULT_RESOLUTION,
+    DEFAULT_SUNRISE_LEAD_TIME,
+    ENTRY_TYPE_AGGREGATE,
+    RESOLUTIONS,
+)
+from .cache import async_pop_seed, async_stash_seed
+from .scheduler import TOKEN_DAILY_REQUEST_BUDGET, async_get_scheduler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,78 +65,338 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 )
 
 
+STEP_REAUTH_DATA_SCHEMA = vol.Schema({vol.Required("access_token"): str})
+
+
 # 2. Die Validierungslogik ersetzen
-async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+async def validate_input(
+    hass: HomeAssistant, data: dict[str, Any], api_type: str = DEFAULT_RESOLUTION
+) -> dict[str, Any]:
     """Validate the user input allows us to connect to the solarprediction API."""
 
-    # Die Platzhalter-Logik ("hub") wird komplett ersetzt.
-    # Stattdessen rufen wir direkt die API auf.
-
-    api_url = "https://solarprognose.de/web/solarprediction/api/v1"
+    # Dieselben Parameter wie der Koordinator, damit die Antwort den Cache
+    # des Eintrags füllen kann und die erste Aktualisierung entfällt.
     params = {
         "access-token": data["access_token"],
         "project": data[CONF_PROJECT],
+        "type": api_type,
     }
 
-    session = async_get_clientsession(hass)
+    # Die Anfrage läuft über den gemeinsamen Scheduler
     try:
-        async with session.get(api_url, params=params) as response:
-            # Wenn die API einen Fehler zurückgibt (z.B. 401 Unauthorized, 404 Not Found)
-            # lösen wir eine Exception aus, die im Flow abgefangen wird.
-            if response.status != 200:
-                # Wir können nicht unterscheiden, ob der Token falsch ist oder
-                # die Verbindung fehlschlägt, also verwenden wir CannotConnect.
-                _LOGGER.error(
-                    "API validation failed with status %s: %s",
-                    response.status,
-                    await response.text(),
-                )
-                raise CannotConnect
-
-            # Wenn alles gut geht, geben wir die Infos zurück, die im Eintrag gespeichert
-            # werden sollen. Wir nutzen den Projektnamen für den Titel des Eintrags.
-            return {"title": data[CONF_PROJECT]}
-
+        response = await async_get_scheduler(hass).async_fetch(
+            data["access_token"], params
+        )
+    except ClientResponseError as exc:
+        _LOGGER.error("API validation failed with status %s", exc.status)
+        if exc.status in (401, 403):
+            raise InvalidAuth from exc
+        raise CannotConnect from exc
     except Exception as exc:
         # Fängt alle anderen Fehler ab (z.B. DNS-Probleme, kein Internet)
         _LOGGER.error("Failed to connect to API during validation: %s", exc)
         raise CannotConnect from exc
 
+    if not isinstance(response, dict) or not isinstance(response.get("data"), dict):
+        _LOGGER.error("API validation returned no forecast: %s", response)
+        raise CannotConnect
+
+    # Wir nutzen den Projektnamen für den Titel des Eintrags.
+    return {"title": data[CONF_PROJECT], "response": response}
+
+
+def _aggregate_unique_id(name: str) -> str:
+    """Return the unique_id of an aggregate, apart from the project ids."""
+    return f"{ENTRY_TYPE_AGGREGATE}_{name}"
+
 
 class ConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Solar Prediction."""
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Return the options flow."""
+        return SolarPredictionOptionsFlow()
+
+    @classmethod
+    @callback
+    def async_supports_options_flow(cls, config_entry: ConfigEntry) -> bool:
+        """Return True for project entries, aggregates make no requests."""
+        return config_entry.data.get(CONF_ENTRY_TYPE) != ENTRY_TYPE_AGGREGATE
+
+    @callback
+    def _project_entries(self) -> list[SelectOptionDict]:
+        """Return the project entries that can be combined."""
+        return [
+            SelectOptionDict(value=entry.entry_id, label=entry.title)
+            for entry in self._async_current_entries(include_ignore=False)
+            if entry.data.get(CONF_ENTRY_TYPE) != ENTRY_TYPE_AGGREGATE
+        ]
+
+    def _aggregate_schema(self) -> vol.Schema:
+        return vol.Schema(
+            {
+                vol.Required(CONF_NAME): str,
+                vol.Required(CONF_MEMBERS): SelectSelector(
+                    SelectSelectorConfig(
+                        options=self._project_entries(), multiple=True
+                    )
+                ),
+            }
+        )
+
+    async def _async_validate(
+        self,
+        user_input: dict[str, Any],
+        errors: dict[str, str],
+        entry: ConfigEntry | None = None,
+    ) -> dict[str, Any] | None:
+        """Validate the credentials and keep the response for the entry setup."""
+        api_type = DEFAULT_RESOLUTION
+        if entry is not None:
+            api_type = entry.options.get(CONF_RESOLUTION, DEFAULT_RESOLUTION)
+        try:
+            info = await validate_input(self.hass, user_input, api_type)
+        except CannotConnect:
+            errors["base"] = "cannot_connect"
+        except InvalidAuth:
+            errors["base"] = "invalid_auth"
+        except Exception:
+            _LOGGER.exception("Unexpected exception")
+            errors["base"] = "unknown"
+        else:
+            async_stash_seed(
+                self.hass,
+                user_input["access_token"],
+                user_input[CONF_PROJECT],
+                info["response"],
+            )
+            return info
+        return None
+
+    @callback
+    def _async_update_seeded_entry(
+        self, entry: ConfigEntry, data: dict[str, Any], **kwargs: Any
+    ) -> None:
+        """Update an entry whose validation response was stashed as seed."""
+        if not self.hass.config_entries.async_update_entry(entry, data=data, **kwargs):
+            # Ohne Änderung läuft der Update-Listener nicht. Die Antwort
+            # würde sonst beim nächsten Laden neuere Cache-Daten überschreiben.
+            async_pop_seed(self.hass, data["access_token"], data[CONF_PROJECT])
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
-        """Handle the initial step."""
+        """Offer an aggregate once there are projects to combine."""
+        if len(self._project_entries()) < 2:
+            return await self.async_step_project(user_input)
+        return self.async_show_menu(
+            step_id="user", menu_options=["project", ENTRY_TYPE_AGGREGATE]
+        )
+
+    async def async_step_project(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Add a solarprognose.de project."""
         errors: dict[str, str] = {}
         if user_input is not None:
-            try:
-                # 3. Die Validierung aufrufen
-                # Diese Zeile ruft unsere neue Logik von oben auf.
-                info = await validate_input(self.hass, user_input)
-            except CannotConnect:
-                errors["base"] = "cannot_connect"
-            except InvalidAuth:
-                # Diese Exception wird von uns nicht mehr direkt ausgelöst,
-                # aber wir behalten sie für den Fall der Fälle.
-                errors["base"] = "invalid_auth"
-            except Exception:
-                _LOGGER.exception("Unexpected exception")
-                errors["base"] = "unknown"
-            else:
-                # Wenn `validate_input` erfolgreich war, erstellen wir den Eintrag.
+            await self.async_set_unique_id(user_input[CONF_PROJECT])
+            self._abort_if_unique_id_configured()
+            if info := await self._async_validate(user_input, errors):
                 # `info["title"]` kommt aus unserer Funktion, `user_input` enthält die
                 # eingegebenen Daten (Token, Projekt) zur Speicherung.
                 return self.async_create_entry(title=info["title"], data=user_input)
 
         # Das Formular wird mit unserem neuen Schema angezeigt.
         return self.async_show_form(
-            step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+            step_id="project", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+        )
+
+    async def async_step_aggregate(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Combine several project entries into one virtual device."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            # Eigener Namensraum, Projekte nutzen ihre Kennung als unique_id
+            await self.async_set_unique_id(
+                _aggregate_unique_id(user_input[CONF_NAME])
+            )
+            self._abort_if_unique_id_configured()
+            if len(user_input[CONF_MEMBERS]) < 2:
+                errors[CONF_MEMBERS] = "too_few_members"
+            else:
+                return self.async_create_entry(
+                    title=user_input[CONF_NAME],
+                    data={
+                        CONF_ENTRY_TYPE: ENTRY_TYPE_AGGREGATE,
+                        CONF_MEMBERS: user_input[CONF_MEMBERS],
+                    },
+                )
+
+        return self.async_show_form(
+            step_id=ENTRY_TYPE_AGGREGATE,
+            data_schema=self.add_suggested_values_to_schema(
+                self._aggregate_schema(), user_input
+            ),
+            errors=errors,
+        )
+
+    async def async_step_reauth(
+        self, entry_data: Mapping[str, Any]
+    ) -> ConfigFlowResult:
+        """Start a reauthentication after the API rejected the access token."""
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Ask for a new access token."""
+        entry = self._get_reauth_entry()
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            data = {**entry.data, "access_token": user_input["access_token"]}
+            if await self._async_validate(data, errors, entry):
+                # Der Eintrag übernimmt den Schlüssel ohne Neuladen, siehe __init__.py
+                self._async_update_seeded_entry(entry, data)
+                return self.async_abort(reason="reauth_successful")
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=STEP_REAUTH_DATA_SCHEMA,
+            description_placeholders={"project": entry.data[CONF_PROJECT]},
+            errors=errors,
+        )
+
+    async def async_step_reconfigure(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Change the access token or the project of an entry."""
+        entry = self._get_reconfigure_entry()
+        if entry.data.get(CONF_ENTRY_TYPE) == ENTRY_TYPE_AGGREGATE:
+            return await self.async_step_reconfigure_aggregate()
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if user_input[CONF_PROJECT] != entry.data[CONF_PROJECT]:
+                await self.async_set_unique_id(user_input[CONF_PROJECT])
+                self._abort_if_unique_id_configured()
+            if await self._async_validate(user_input, errors, entry):
+                self._async_update_seeded_entry(
+                    entry,
+                    {**entry.data, **user_input},
+                    title=user_input[CONF_PROJECT],
+                    unique_id=user_input[CONF_PROJECT],
+                )
+                return self.async_abort(reason="reconfigure_successful")
+
+        return self.async_show_form(
+            step_id="reconfigure",
+            data_schema=self.add_suggested_values_to_schema(
+                STEP_USER_DATA_SCHEMA, user_input or entry.data
+            ),
+            errors=errors,
+        )
+
+    async def async_step_reconfigure_aggregate(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Change the name or the members of an aggregate."""
+        entry = self._get_reconfigure_entry()
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if user_input[CONF_NAME] != entry.title:
+                await self.async_set_unique_id(
+                    _aggregate_unique_id(user_input[CONF_NAME])
+                )
+                self._abort_if_unique_id_configured()
+            if len(user_input[CONF_MEMBERS]) < 2:
+                errors[CONF_MEMBERS] = "too_few_members"
+            else:
+                # Das Neuladen übernimmt der Update-Listener, siehe __init__.py
+                self.hass.config_entries.async_update_entry(
+                    entry,
+                    data={**entry.data, CONF_MEMBERS: user_input[CONF_MEMBERS]},
+                    title=user_input[CONF_NAME],
+                    unique_id=_aggregate_unique_id(user_input[CONF_NAME]),
+                )
+                return self.async_abort(reason="reconfigure_successful")
+
+        return self.async_show_form(
+            step_id="reconfigure_aggregate",
+            data_schema=self.add_suggested_values_to_schema(
+                self._aggregate_schema(),
+                user_input
+                or {CONF_NAME: entry.title, CONF_MEMBERS: entry.data[CONF_MEMBERS]},
+            ),
+            errors=errors,
+        )
+
+
+class SolarPredictionOptionsFlow(OptionsFlow):
+    """Handle the refresh policy options."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_RESOLUTION,
+                    default=options.get(CONF_RESOLUTION, DEFAULT_RESOLUTION),
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=RESOLUTIONS, translation_key=CONF_RESOLUTION
+                    )
+                ),
+                vol.Required(
+                    CONF_NIGHT_PAUSE,
+                    default=options.get(CONF_NIGHT_PAUSE, DEFAULT_NIGHT_PAUSE),
+                ): bool,
+                vol.Required(
+                    CONF_SUNRISE_LEAD_TIME,
+                    default=options.get(
+                        CONF_SUNRISE_LEAD_TIME, DEFAULT_SUNRISE_LEAD_TIME
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=360)),
+                vol.Required(
+                    CONF_MAX_REQUESTS_PER_DAY,
+                    default=options.get(
+                        CONF_MAX_REQUESTS_PER_DAY, DEFAULT_MAX_REQUESTS_PER_DAY
+                    ),
+                ): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=TOKEN_DAILY_REQUEST_BUDGET)
+                ),
+                vol.Required(
+                    CONF_ARCHIVE_RETENTION,
+                    default=options.get(
+                        CONF_ARCHIVE_RETENTION, DEFAULT_ARCHIVE_RETENTION
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=730)),
+                vol.Optional(
+                    CONF_PRODUCTION_SENSOR,
+                    description={
+                        "suggested_value": options.get(CONF_PRODUCTION_SENSOR)
+                    },
+                ): EntitySelector(
+                    EntitySelectorConfig(
+                        domain="sensor", device_class=SensorDeviceClass.ENERGY
+                    )
+                ),
+                vol.Required(
+                    CONF_INSTRUMENTATION,
+                    default=options.get(CONF_INSTRUMENTATION, DEFAULT_INSTRUMENTATION),
+                ): bool,
+            }
         )
+        return self.async_show_form(step_id="init", data_schema=schema)
 
 
 # 4. Die Fehlerklassen behalten wir bei
@@ -2,3 +2,55 @@
 
 DOMAIN = "solar_prediction"
 CONF_PROJECT = "project"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_DAY = "day"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_DURATION = "duration"
+ATTR_POWER_KW = "power_kw"
+ATTR_PROFILE = "profile"
+ATTR_PROFILE_STEP = "profile_step"
+ATTR_EARLIEST_START = "earliest_start"
+ATTR_LATEST_END = "latest_end"
+ATTR_HOUR = "hour"
+ATTR_LEAD_TIME = "lead_time"
+ATTR_CORRECTED = "corrected"
+
+SERVICE_GET_FORECAST = "get_forecast"
+SERVICE_QUERY_ENERGY = "query_energy"
+SERVICE_FIND_BEST_WINDOW = "find_best_window"
+SERVICE_GET_ARCHIVED_FORECAST = "get_archived_forecast"
+
+DATA_SCHEDULER = "scheduler"
+DATA_SEEDS = "seeds"
+
+CONF_NIGHT_PAUSE = "night_pause"
+CONF_SUNRISE_LEAD_TIME = "sunrise_lead_time"
+CONF_MAX_REQUESTS_PER_DAY = "max_requests_per_day"
+
+DEFAULT_NIGHT_PAUSE = True
+DEFAULT_SUNRISE_LEAD_TIME = 60
+DEFAULT_MAX_REQUESTS_PER_DAY = 24
+
+CONF_INSTRUMENTATION = "instrumentation"
+DEFAULT_INSTRUMENTATION = False
+
+CONF_ARCHIVE_RETENTION = "archive_retention"
+# Standardmäßig aus, jede Revision wird auf den Datenträger geschrieben
+DEFAULT_ARCHIVE_RETENTION = 0
+
+CONF_PRODUCTION_SENSOR = "production_sensor"
+
+# Werte entsprechen dem Parameter "type" der API
+CONF_RESOLUTION = "resolution"
+RESOLUTION_HOURLY = "hourly"
+RESOLUTION_QUARTER_HOURLY = "quarterhourly"
+RESOLUTIONS = [RESOLUTION_HOURLY, RESOLUTION_QUARTER_HOURLY]
+DEFAULT_RESOLUTION = RESOLUTION_HOURLY
+
+# Virtuelles Gerät, das mehrere Projekte zu einer Anlage zusammenfasst
+CONF_ENTRY_TYPE = "entry_type"
+ENTRY_TYPE_AGGREGATE = "aggregate"
+CONF_MEMBERS = "members"
+SIGNAL_MEMBER_UPDATED = f"{DOMAIN}_member_updated"
@@ -1,137 +1,319 @@
 """DataUpdateCoordinator for the Solar Prediction integration."""
 import logging
-from datetime import timedelta
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed, HomeAssistantError
 from aiohttp.client_exceptions import ClientResponseError
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.util import dt as dt_util
 from homeassistant.helpers import event
-from homeassistant.helpers.storage import Store
 
-from .const import DOMAIN
+from .archive import SolarForecastArchive
+from .bias import BiasCorrection
+from .cache import SolarPredictionCache
+from .const import (
+    CONF_ARCHIVE_RETENTION,
+    CONF_INSTRUMENTATION,
+    CONF_PRODUCTION_SENSOR,
+    CONF_RESOLUTION,
+    DEFAULT_ARCHIVE_RETENTION,
+    DEFAULT_INSTRUMENTATION,
+    DEFAULT_RESOLUTION,
+    DOMAIN,
+)
+from .forecast import SolarForecast, forecast_fingerprint
+from .metrics import SolarPredictionMetrics
+from .policy import RefreshPolicy
+from .retry import CircuitBreaker
+from .scheduler import async_get_scheduler
+from .statistics import ForecastStatistics
+from .timeline import ForecastTimeline
 
 _LOGGER = logging.getLogger(__name__)
 FALLBACK_SCAN_INTERVAL = timedelta(hours=1, minutes=5)
-CACHE_VERSION = 1
 
 class SolarPredictionDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching data from the API with dynamic scheduling and caching."""
 
-    def __init__(self, hass: HomeAssistant, access_token: str, project: str, config_entry_id: str):
-        # ... __init__ bleibt unverändert ...
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        access_token: str,
+        project: str,
+        config_entry_id: str,
+        options: Mapping[str, Any] | None = None,
+    ):
         self.access_token = access_token
         self.project = project
-        self._store = Store(hass, CACHE_VERSION, f"solar_prediction_{config_entry_id}")
+        options = options or {}
+        self.options = dict(options)
+        self.api_type: str = options.get(CONF_RESOLUTION, DEFAULT_RESOLUTION)
+        self.metrics = SolarPredictionMetrics(
+            options.get(CONF_INSTRUMENTATION, DEFAULT_INSTRUMENTATION)
+        )
+        self.cache = SolarPredictionCache(hass, config_entry_id, self.metrics)
+        self.archive = SolarForecastArchive(
+            hass,
+            config_entry_id,
+            options.get(CONF_ARCHIVE_RETENTION, DEFAULT_ARCHIVE_RETENTION),
+            self.metrics,
+        )
+        self.statistics = ForecastStatistics(
+            hass, config_entry_id, project, self.metrics
+        )
+        self.bias: BiasCorrection | None = None
+        if production_sensor := options.get(CONF_PRODUCTION_SENSOR):
+            self.bias = BiasCorrection(hass, config_entry_id, production_sensor)
+        self.scheduler = async_get_scheduler(hass)
         self.last_api_error: str | None = None
+        self.forecast = SolarForecast.from_api(None)
+        self.timeline = ForecastTimeline(self.forecast)
+        self.update_stats = {"applied": 0, "skipped": 0}
+        self.policy = RefreshPolicy(hass, options)
+        self.breaker = CircuitBreaker()
+        self.stale = False
+        self.setup_duration: float | None = None
+        self._unsub_scheduled_refresh: CALLBACK_TYPE | None = None
+        self._unregister_scheduler: CALLBACK_TYPE | None = None
         super().__init__(
             hass, _LOGGER, name=DOMAIN, update_interval=FALLBACK_SCAN_INTERVAL
         )
 
-    # _async_refresh bleibt unverändert
     async def _async_refresh(self, *args, **kwargs) -> None:
         if self.data is None:
-            cached_file_content = await self._store.async_load()
-            if cached_file_content:
-                self.data = cached_file_content.get("data")
-                if self.data:
-                    self.last_update_success = True
-        if self.data:
+            if cached_data := await self.cache.async_load():
+                self.data = cached_data
+                self._apply_forecast(cached_data)
+                self.last_update_success = True
+        if self.data and self.cache_is_current:
             try:
                 next_request_epoch = self.data["preferredNextApiRequestAt"]["epochTimeUtc"]
                 now_epoch = int(dt_util.utcnow().timestamp())
                 if now_epoch < next_request_epoch:
                     _LOGGER.debug("Skipping API refresh, using cached data as it is still valid.")
+                    self.metrics.increment("cache_hits")
                     self._schedule_refresh()
                     return
             except (KeyError, TypeError):
                 _LOGGER.warning("Cached data is malformed, forcing a new API request.")
+        if not self.breaker.allow_request():
+            _LOGGER.debug(
+                "Circuit breaker open, serving in-memory data until %s",
+                self.breaker.next_attempt,
+            )
+            self._schedule_refresh()
+            return
         await super()._async_refresh(*args, **kwargs)
 
     async def _async_update_data(self) -> dict:
         """Fetch data from API endpoint and fallback to cache."""
         try:
-            # ... API-Abruf bleibt unverändert ...
-            api_url = "https://solarprognose.de/web/solarprediction/api/v1"
-            params = {"access-token": self.access_token, "project": self.project, "type": "hourly"}
-            session = async_get_clientsession(self.hass)
-            async with session.get(api_url, params=params) as response:
-                response.raise_for_status()
-                data = await response.json()
-
-                # === NEU: DATEN-TRANSFORMATION ===
-                # Wir berechnen die kumulativen kWh-Werte basierend auf den kW-Leistungswerten neu.
-                forecast_data = data.get("data")
-                if forecast_data:
-                    # 1. Zeitstempel sortieren, um eine korrekte Reihenfolge sicherzustellen
-                    timestamps = sorted([int(ts) for ts in forecast_data.keys()])
-
-                    recalculated_cumulative_kwh = 0.0
-                    # Setze den ersten kumulativen Wert explizit auf 0
-                    if timestamps:
-                        forecast_data[str(timestamps[0])][2] = 0.0
-
-                    # 2. Iteriere durch die Zeit-Intervalle
-                    for i in range(len(timestamps) - 1):
-                        current_ts = timestamps[i]
-                        next_ts = timestamps[i+1]
-
-                        # Verarbeite nur lückenlose Stunden-Intervalle
-                        if next_ts - current_ts == 3600:
-                            power_current = float(forecast_data[str(current_ts)][1])
-                            power_next = float(forecast_data[str(next_ts)][1])
-
-                            # 3. Berechne Energie für diese Stunde (Trapez-Formel)
-                            # Energie (kWh) = Durchschnittsleistung (kW) * 1 Stunde
-                            hourly_energy = (power_current + power_next) / 2.0
-                            recalculated_cumulative_kwh += hourly_energy
-
-                        # 4. Überschreibe den alten kumulativen Wert mit dem neuen, korrekten Wert
-                        forecast_data[str(next_ts)][2] = round(recalculated_cumulative_kwh, 3)
-
-                await self._store.async_save({"data": data})
-                self.last_api_error = None
-                return data
+            # Der gemeinsame Scheduler bündelt Anfragen aller Einträge
+            params = {"access-token": self.access_token, "project": self.project, "type": self.api_type}
+            data = await self.scheduler.async_fetch(
+                self.access_token, params, self.metrics, self._record_request
+            )
+
+            # Nur bei geänderten Prognosewerten neu in das Modell überführen
+            fingerprint = forecast_fingerprint(data.get("data"))
+            if self._apply_forecast(data, fingerprint):
+                await self._async_archive_forecast()
+                await self._async_import_statistics()
+            else:
+                self.update_stats["skipped"] += 1
+
+            self.cache.async_set(data, self.api_type, fingerprint)
+            self.breaker.record_success()
+            self.stale = False
+            self.last_api_error = None
+            return data
         except Exception as err:
-            # ... Fehlerbehandlung bleibt unverändert ...
             if isinstance(err, ClientResponseError):
                 self.last_api_error = f"API Fehler {err.status}: {err.message}"
             else:
                 self.last_api_error = str(err)
-            _LOGGER.warning("API request failed (%s). Trying to load from cache.", err)
-            cached_file_content = await self._store.async_load()
-            if cached_file_content and "data" in cached_file_content:
-                cached_data = cached_file_content["data"]
-                _LOGGER.info("Successfully loaded data from cache during operation.")
+            next_attempt = self.breaker.record_failure(err)
+            self.stale = True
+            _LOGGER.warning(
+                "API request failed (%s), retrying at %s. Trying to load from cache.",
+                err,
+                next_attempt,
+            )
+            if isinstance(err, ClientResponseError) and err.status in (401, 403):
+                # Startet den Reauth-Flow, die Sensoren behalten die letzten Daten
+                raise ConfigEntryAuthFailed(self.last_api_error) from err
+            if (cached_data := self.cache.data) is not None:
+                _LOGGER.info("Serving in-memory cached data during operation.")
+                self.metrics.increment("cache_fallbacks")
+                self._apply_forecast(cached_data)
                 return cached_data
             _LOGGER.error("API failed and no cached data available.")
             raise UpdateFailed(f"Error communicating with API: {err}") from err
 
-    # _schedule_refresh bleibt unverändert
+    @callback
+    def _record_request(self) -> None:
+        """Count an HTTP request actually made for this entry."""
+        self.policy.record_request()
+        self.metrics.increment("api_calls")
+
+    @property
+    def cache_is_current(self) -> bool:
+        """Return True if the cached response has the configured resolution."""
+        return self.cache.request_type == self.api_type
+
+    @callback
+    def async_register_scheduler(self) -> CALLBACK_TYPE:
+        """Register the access token with the shared scheduler."""
+        self._unregister_scheduler = self.scheduler.async_register(self.access_token)
+
+        @callback
+        def _unregister() -> None:
+            if self._unregister_scheduler:
+                self._unregister_scheduler()
+                self._unregister_scheduler = None
+
+        return _unregister
+
+    @callback
+    def async_update_access_token(
+        self, access_token: str, data: dict | None = None
+    ) -> None:
+        """Switch to a new access token without reloading the entry.
+
+        ``data`` is the API response of the validation in the config flow;
+        it is applied like a fetch, so no request is made for the new token.
+        """
+        if access_token != self.access_token:
+            # Erst neu registrieren, damit der Scheduler nicht verworfen wird
+            unregister = self.scheduler.async_register(access_token)
+            if self._unregister_scheduler:
+                self._unregister_scheduler()
+            self._unregister_scheduler = unregister
+            self.access_token = access_token
+        self.breaker.record_success()
+        self.last_api_error = None
+        if data is not None:
+            self.cache.async_set(data, self.api_type)
+            self.stale = False
+            self.async_set_updated_data(data)
+        else:
+            self._schedule_refresh()
+
+    @callback
+    def async_set_updated_data(self, data: dict) -> None:
+        """Manually update data and rebuild the forecast model."""
+        self._apply_forecast(data)
+        super().async_set_updated_data(data)
+
+    def _apply_forecast(self, data: dict, fingerprint: int | None = None) -> bool:
+        """Rebuild the forecast model if the forecast values changed."""
+        forecast_data = data.get("data")
+        if fingerprint is None:
+            fingerprint = forecast_fingerprint(forecast_data)
+        if fingerprint == self.forecast.fingerprint:
+            return False
+        with self.metrics.timer("transform"):
+            self.forecast = SolarForecast.from_api(forecast_data, fingerprint)
+            # Einmal je Prognose, die Sensoren schlagen darin nur noch nach
+            self.timeline = ForecastTimeline(self.forecast)
+        self.update_stats["applied"] += 1
+        return True
+
+    @property
+    def corrected_forecast(self) -> SolarForecast:
+        """Return the forecast corrected by the learned production bias."""
+        if self.bias is None:
+            return self.forecast
+        return self.bias.corrected(self.forecast)
+
+    async def _async_archive_forecast(self) -> None:
+        """Append the applied forecast to the history archive."""
+        try:
+            await self.archive.async_append(
+                int(dt_util.utcnow().timestamp()), self.forecast
+            )
+        except OSError as err:
+            _LOGGER.warning("Could not archive forecast revision: %s", err)
+
+    async def _async_import_statistics(self) -> None:
+        """Write the changed forecast hours into the long-term statistics."""
+        try:
+            await self.statistics.async_import(self.forecast)
+        except HomeAssistantError as err:
+            _LOGGER.warning("Could not import forecast statistics: %s", err)
+
+    @callback
+    def async_track_day_rollover(self) -> CALLBACK_TYPE:
+        """Rebuild the day index at local midnight."""
+        return event.async_track_time_change(
+            self.hass, self._async_handle_day_rollover, hour=0, minute=0, second=0
+        )
+
+    @callback
+    def async_track_production(self) -> CALLBACK_TYPE:
+        """Compare the forecast with the production sensor at every full hour."""
+        return event.async_track_time_change(
+            self.hass, self._async_handle_hour, minute=0, second=0
+        )
+
+    @callback
+    def _async_handle_hour(self, now: datetime) -> None:
+        if self.bias is not None and self.bias.async_add_hour(now, self.forecast):
+            self.async_update_listeners()
+
+    @callback
+    def _async_handle_day_rollover(self, _now) -> None:
+        self.forecast.build_day_index()
+        if self.bias is not None:
+            self.corrected_forecast.build_day_index()
+        self.async_update_listeners()
+        if self.archive.enabled:
+            self.hass.async_create_background_task(
+                self._async_compact_archive(), f"{DOMAIN} archive compaction"
+            )
+
+    async def _async_compact_archive(self) -> None:
+        try:
+            await self.archive.async_compact()
+        except OSError as err:
+            _LOGGER.warning("Could not compact forecast archive: %s", err)
+
     def _schedule_refresh(self) -> None:
+        """Schedule the next refresh as suggested by the API and the refresh policy."""
+        preferred: datetime | None = None
         if self.last_api_error:
-            _LOGGER.warning(
-                "API error detected. Falling back to the default refresh interval of %s.",
-                self.update_interval
-            )
-            super()._schedule_refresh()
-            return
-        if self.last_update_success and self.data:
+            preferred = self.breaker.next_attempt
+        elif self.last_update_success and self.data:
             try:
                 next_request_epoch = self.data["preferredNextApiRequestAt"]["epochTimeUtc"]
-                now_epoch = int(dt_util.utcnow().timestamp())
-                delay_seconds = max(0, next_request_epoch - now_epoch) + 5
-                _LOGGER.debug(
-                    "Scheduling next API refresh in %s seconds as suggested by API",
-                    delay_seconds
+                preferred = dt_util.utc_from_timestamp(
+                    next_request_epoch + 5 + self.scheduler.jitter(self.access_token)
                 )
-                event.async_call_later(
-                    self.hass, delay_seconds, self._handle_refresh_interval
-                )
-                return
             except (KeyError, TypeError) as e:
                 _LOGGER.warning(
                     "Could not determine next refresh time, falling back. Error: %s", e
                 )
-        super()._schedule_refresh()
\ No newline at end of file
+        if preferred is None:
+            preferred = dt_util.utcnow() + self.update_interval
+
+        next_refresh = self.policy.next_refresh(preferred)
+        _LOGGER.debug("Scheduling next API refresh at %s", next_refresh)
+        self._async_unsub_refresh()
+        self._unsub_scheduled_refresh = event.async_track_point_in_utc_time(
+            self.hass, self._async_handle_scheduled_refresh, next_refresh
+        )
+
+    async def _async_handle_scheduled_refresh(self, _now: datetime) -> None:
+        self._unsub_scheduled_refresh = None
+        await self._handle_refresh_interval()
+
+    @callback
+    def _async_unsub_refresh(self) -> None:
+        """Cancel the scheduled refresh."""
+        super()._async_unsub_refresh()
+        if self._unsub_scheduled_refresh:
+            self._unsub_scheduled_refresh()
+            self._unsub_scheduled_refresh = None
@@ -0,0 +1,100 @@
+"""Diagnostics support for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_ACCESS_TOKEN
+from homeassistant.core import HomeAssistant
+
+from . import SolarPredictionConfigEntry
+from .aggregate import SolarPredictionAggregateCoordinator
+from .const import CONF_PROJECT
+
+TO_REDACT = {CONF_ACCESS_TOKEN, CONF_PROJECT, "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: SolarPredictionConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data
+    forecast = coordinator.forecast
+    if isinstance(coordinator, SolarPredictionAggregateCoordinator):
+        return {
+            "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+            "members": {
+                entry_id: {
+                    "loaded": entry_id in coordinator.members,
+                    "samples": (
+                        len(coordinator.members[entry_id].forecast)
+                        if entry_id in coordinator.members
+                        else None
+                    ),
+                }
+                for entry_id in coordinator.member_ids
+            },
+            "update_stats": dict(coordinator.update_stats),
+            "forecast": {
+                "samples": len(forecast),
+                "step_s": forecast.step,
+                "gaps": len(forecast.gaps),
+                "days": {
+                    day.isoformat(): forecast.day_total(day)
+                    for day in forecast.days()
+                },
+            },
+            "metrics": coordinator.metrics.as_dict(),
+        }
+    breaker = coordinator.breaker
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "last_api_error": coordinator.last_api_error,
+            "stale": coordinator.stale,
+            "setup_duration_ms": (
+                round(coordinator.setup_duration * 1000, 3)
+                if coordinator.setup_duration is not None
+                else None
+            ),
+            "update_stats": dict(coordinator.update_stats),
+            "requests_today": coordinator.policy.requests_today,
+            "remaining_token_budget": coordinator.scheduler.remaining_budget(
+                coordinator.access_token
+            ),
+            "circuit_breaker": {
+                "state": breaker.state,
+                "failures": breaker.failures,
+                "next_attempt": (
+                    breaker.next_attempt.isoformat() if breaker.next_attempt else None
+                ),
+            },
+            "preferred_next_request": (coordinator.data or {}).get(
+                "preferredNextApiRequestAt"
+            ),
+        },
+        "forecast": {
+            "samples": len(forecast),
+            "step_s": forecast.step,
+            "gaps": len(forecast.gaps),
+            "request_type": coordinator.api_type,
+            "cached_request_type": coordinator.cache.request_type,
+            "first_epoch": forecast.epochs[0] if len(forecast) else None,
+            "last_epoch": forecast.epochs[-1] if len(forecast) else None,
+            "days": {
+                day.isoformat(): forecast.day_total(day) for day in forecast.days()
+            },
+        },
+        "archive": {
+            "retention_days": coordinator.archive.retention // 86400,
+            "revisions": coordinator.archive.revisions,
+            "size_bytes": coordinator.archive.size,
+        },
+        "statistics_watermark": coordinator.statistics.watermark,
+        "bias_correction": (
+            coordinator.bias.as_dict() if coordinator.bias is not None else None
+        ),
+        "metrics": coordinator.metrics.as_dict(),
+    }
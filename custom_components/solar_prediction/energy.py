@@ -0,0 +1,23 @@
+"""Energy platform for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_solar_forecast(
+    hass: HomeAssistant, config_entry_id: str
+) -> dict[str, dict[str, float | int]] | None:
+    """Return the solar forecast for the Energy dashboard."""
+    entry = hass.config_entries.async_get_entry(config_entry_id)
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        return None
+    # Wird einmal pro Prognose berechnet und bis zur nächsten Änderung gecacht
+    return {"wh_hours": entry.runtime_data.forecast.wh_hours()}
@@ -0,0 +1,62 @@
+"""Base entity for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from collections.abc import Hashable
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .aggregate import SolarPredictionAggregateCoordinator
+from .const import DOMAIN
+from .coordinator import SolarPredictionDataUpdateCoordinator
+
+
+class SolarPredictionEntity(
+    CoordinatorEntity[
+        SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator
+    ]
+):
+    """Coordinator entity that only writes its state when it changed."""
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        coordinator: (
+            SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator
+        ),
+    ) -> None:
+        super().__init__(coordinator)
+        self._last_state_key: Hashable | None = None
+        aggregate = isinstance(coordinator, SolarPredictionAggregateCoordinator)
+        name = coordinator.title if aggregate else coordinator.project
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, coordinator.project)},
+            "name": f"Solar Prediction ({name})",
+            "manufacturer": "solarprognose.de",
+            "model": "Aggregate" if aggregate else "Cloud API",
+            "entry_type": "service",
+        }
+
+    def _state_key(self) -> Hashable | None:
+        """Return a cheap fingerprint of everything the state depends on.
+
+        None disables the check and writes the state on every update.
+        """
+        return None
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the fingerprint of the initial state."""
+        await super().async_added_to_hass()
+        self._last_state_key = self._state_key()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if the fingerprint changed."""
+        state_key = self._state_key()
+        if state_key is not None and state_key == self._last_state_key:
+            self.coordinator.metrics.increment("skipped_writes")
+            return
+        self._last_state_key = state_key
+        super()._handle_coordinator_update()
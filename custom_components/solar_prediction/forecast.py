@@ -0,0 +1,493 @@
+"""Array-backed forecast model for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from datetime import date, timedelta
+from heapq import merge
+from typing import Any
+
+from homeassistant.helpers.json import json_bytes
+from homeassistant.util import dt as dt_util
+
+MAX_CACHED_WINDOWS = 32
+# Intervalle über dem Doppelten des Rasters gelten als Lücke
+GAP_FACTOR = 2
+
+
+def forecast_fingerprint(forecast_data: dict[str, Any] | None) -> int:
+    """Return a hash over the forecast values (``data`` map) of an API response."""
+    return hash(json_bytes(forecast_data))
+
+
+def format_gaps(gaps: list[tuple[int, int]]) -> list[dict[str, str]]:
+    """Return gaps as local ISO start and end times."""
+    # Aneinandergrenzende Lücken (z. B. nach dem Zusammenführen) zusammenfassen
+    joined: list[list[int]] = []
+    for start, end in gaps:
+        if joined and joined[-1][1] == start:
+            joined[-1][1] = end
+        else:
+            joined.append([start, end])
+    return [
+        {
+            "start": dt_util.as_local(dt_util.utc_from_timestamp(start)).isoformat(),
+            "end": dt_util.as_local(dt_util.utc_from_timestamp(end)).isoformat(),
+        }
+        for start, end in joined
+    ]
+
+
+def local_hour_shift(timestamp: float) -> int:
+    """Return the seconds by which local full hours are offset from UTC hours."""
+    # Nur in Zeitzonen mit halbstündigem Versatz ungleich null
+    offset = dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).utcoffset()
+    return int(offset.total_seconds()) % 3600 if offset else 0
+
+
+def interpolate_cumulative(
+    epochs: Sequence[int],
+    power: Sequence[float],
+    cumulative: Sequence[float],
+    timestamp: float,
+) -> float:
+    """Return the cumulative energy (kWh) of sample columns at a time.
+
+    Between two samples the power is interpolated linearly, so partial
+    intervals are integrated exactly instead of rounded to a sample.
+    """
+    if not epochs or timestamp <= epochs[0]:
+        return 0.0
+    if timestamp >= epochs[-1]:
+        return cumulative[-1]
+    i = bisect_right(epochs, timestamp) - 1
+    if timestamp == epochs[i] or cumulative[i + 1] == cumulative[i]:
+        return cumulative[i]
+    span = epochs[i + 1] - epochs[i]
+    elapsed = timestamp - epochs[i]
+    power_at = power[i] + (power[i + 1] - power[i]) * elapsed / span
+    # Anteil der Trapezfläche bis zum Zeitpunkt, bezogen auf das ganze Intervall
+    partial = elapsed * (power[i] + power_at)
+    full = span * (power[i] + power[i + 1])
+    return cumulative[i] + (cumulative[i + 1] - cumulative[i]) * partial / full
+
+
+class SolarForecast:
+    """Compact, immutable view of one API forecast.
+
+    The raw API answer maps string timestamps to ``[epoch, power_kw, cumulative]``.
+    It is parsed once per fetch into sorted arrays, so that the sensors can
+    answer without converting timestamps again. Any resolution is accepted;
+    intervals longer than ``GAP_FACTOR`` times the regular step are
+    interpolated linearly and listed in ``gaps``.
+    """
+
+    __slots__ = (
+        "epochs",
+        "power",
+        "cumulative",
+        "fingerprint",
+        "step",
+        "gaps",
+        "_days",
+        "_day_forecasts",
+        "_day_fingerprints",
+        "_wh_hours",
+        "_hourly",
+        "_windows",
+    )
+
+    def __init__(
+        self,
+        epochs: array,
+        power: array,
+        cumulative: array,
+        fingerprint: int | None = None,
+        step: int = 0,
+        gaps: array | None = None,
+    ) -> None:
+        self.epochs = epochs
+        self.power = power
+        self.cumulative = cumulative
+        self.fingerprint = fingerprint
+        self.step = step
+        self.gaps = gaps if gaps is not None else array("q")
+        self._days: dict[date, tuple[int, int]] = {}
+        self._day_forecasts: dict[date, dict[str, dict[str, float]]] = {}
+        self._day_fingerprints: dict[date, int] = {}
+        self._wh_hours: dict[str, float] | None = None
+        self._hourly: tuple[array, array] | None = None
+        self._windows: dict[tuple, tuple[int, float] | None] = {}
+        self.build_day_index()
+
+    @classmethod
+    def from_api(
+        cls, forecast_data: dict[str, Any] | None, fingerprint: int | None = None
+    ) -> SolarForecast:
+        """Parse the ``data`` map of an API response."""
+        epochs, power = array("q"), array("d")
+        ordered = True
+        for values in (forecast_data or {}).values():
+            epoch = int(values[0])
+            if epochs and epoch <= epochs[-1]:
+                ordered = False
+            epochs.append(epoch)
+            power.append(float(values[1]))
+        if not ordered:
+            order = sorted(range(len(epochs)), key=epochs.__getitem__)
+            epochs = array("q", [epochs[i] for i in order])
+            power = array("d", [power[i] for i in order])
+
+        # Regelmäßiges Raster = kleinster Abstand zweier Stützstellen
+        count = len(epochs)
+        step = min(
+            (epochs[i] - epochs[i - 1] for i in range(1, count)),
+            default=0,
+        )
+        if step <= 0 and count > 1:
+            # Doppelte Zeitstempel, nur den jeweils letzten Wert behalten
+            keep = [
+                i for i in range(count) if i + 1 == count or epochs[i + 1] != epochs[i]
+            ]
+            epochs = array("q", [epochs[i] for i in keep])
+            power = array("d", [power[i] for i in keep])
+            count = len(epochs)
+            step = min(
+                (epochs[i] - epochs[i - 1] for i in range(1, count)), default=0
+            )
+
+        # Kumulative kWh per Trapez-Formel über beliebige Intervalle. Lücken
+        # werden linear überbrückt und vermerkt, sofern dort Leistung anliegt.
+        cumulative = array("d", bytes(8 * count))
+        gaps = array("q")
+        max_span = step * GAP_FACTOR
+        total = 0.0
+        for i in range(1, count):
+            span = epochs[i] - epochs[i - 1]
+            area = power[i - 1] + power[i]
+            if span > max_span and area:
+                gaps.append(i)
+            total += area * span / 7200.0
+            cumulative[i] = total
+        return cls(epochs, power, cumulative, fingerprint, step, gaps)
+
+    @classmethod
+    def merged(cls, forecasts: Sequence[SolarForecast]) -> SolarForecast:
+        """Return the sum of several forecasts on the union of their samples.
+
+        The sample times are combined with a sorted merge. Each forecast is
+        interpolated linearly at the times of the others, so forecasts of
+        different resolutions add up exactly. The result covers the period
+        for which all non-empty forecasts have samples.
+        """
+        fingerprint = hash(tuple(forecast.fingerprint for forecast in forecasts))
+        members = [forecast for forecast in forecasts if len(forecast) > 1]
+        if not members:
+            return cls(array("q"), array("d"), array("d"), fingerprint)
+        first = max(member.epochs[0] for member in members)
+        last = min(member.epochs[-1] for member in members)
+
+        epochs = array("q")
+        for epoch in merge(
+            *(
+                member.epochs[
+                    bisect_left(member.epochs, first) : bisect_right(
+                        member.epochs, last
+                    )
+                ]
+                for member in members
+            )
+        ):
+            if not epochs or epoch != epochs[-1]:
+                epochs.append(epoch)
+        count = len(epochs)
+        power = array("d", bytes(8 * count))
+        in_gap = bytearray(count)
+        for member in members:
+            m_epochs, m_power = member.epochs, member.power
+            m_gaps = set(member.gaps)
+            last_index = len(m_epochs) - 1
+            j = 0
+            for i in range(count):
+                epoch = epochs[i]
+                while j < last_index and m_epochs[j + 1] <= epoch:
+                    j += 1
+                if m_epochs[j] == epoch:
+                    power[i] += m_power[j]
+                    # Das Intervall bis hierher endet an Stützstelle j
+                    if j in m_gaps:
+                        in_gap[i] = 1
+                    continue
+                left, right = m_epochs[j], m_epochs[j + 1]
+                power[i] += m_power[j] + (m_power[j + 1] - m_power[j]) * (
+                    epoch - left
+                ) / (right - left)
+                if j + 1 in m_gaps:
+                    in_gap[i] = 1
+
+        # Die Summen stückweise linearer Kurven sind auf dem gemeinsamen
+        # Raster wieder linear, die Trapez-Formel bleibt also exakt.
+        cumulative = array("d", bytes(8 * count))
+        gaps = array("q")
+        total = 0.0
+        for i in range(1, count):
+            total += (power[i - 1] + power[i]) * (epochs[i] - epochs[i - 1]) / 7200.0
+            cumulative[i] = total
+            if in_gap[i]:
+                gaps.append(i)
+        step = min(member.step for member in members)
+        return cls(epochs, power, cumulative, fingerprint, step, gaps)
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+    def gaps_between(self, start: float, end: float) -> list[tuple[int, int]]:
+        """Return the interpolated gaps that overlap ``[start, end)``."""
+        epochs, gaps = self.epochs, self.gaps
+        # Lücke i reicht von epochs[i - 1] bis epochs[i]
+        first = bisect_left(gaps, bisect_right(epochs, start))
+        result = []
+        for i in gaps[first:]:
+            if epochs[i - 1] >= end:
+                break
+            result.append((epochs[i - 1], epochs[i]))
+        return result
+
+    def build_day_index(self) -> None:
+        """Map each local day of the horizon to its ``[start, end)`` offsets.
+
+        Only the local midnights are converted, not every sample. Must be
+        called again when the local day rolls over or the time zone changes.
+        """
+        self._days = {}
+        self._day_forecasts = {}
+        self._day_fingerprints = {}
+        if not self.epochs:
+            return
+        epochs = self.epochs
+        day = dt_util.as_local(dt_util.utc_from_timestamp(epochs[0])).date()
+        last_day = dt_util.as_local(dt_util.utc_from_timestamp(epochs[-1])).date()
+        start = 0
+        while day <= last_day:
+            next_day = day + timedelta(days=1)
+            next_midnight = int(dt_util.start_of_local_day(next_day).timestamp())
+            end = bisect_left(epochs, next_midnight, start)
+            if end > start:
+                self._days[day] = (start, end)
+            start = end
+            day = next_day
+
+    def days(self) -> list[date]:
+        """Return the local days covered by the forecast."""
+        return list(self._days)
+
+    def day_range(self, day: date) -> tuple[int, int] | None:
+        """Return the ``[start, end)`` offsets of a local day."""
+        return self._days.get(day)
+
+    def day_gaps(self, day: date) -> list[tuple[int, int]]:
+        """Return the interpolated gaps that end within a local day."""
+        if (bounds := self._days.get(day)) is None:
+            return []
+        epochs, gaps = self.epochs, self.gaps
+        first, last = bisect_left(gaps, bounds[0]), bisect_left(gaps, bounds[1])
+        return [(epochs[i - 1], epochs[i]) for i in gaps[first:last]]
+
+    def day_fingerprint(self, day: date) -> int | None:
+        """Return a hash over the samples of a local day."""
+        if (cached := self._day_fingerprints.get(day)) is not None:
+            return cached
+        if (bounds := self._days.get(day)) is None:
+            return None
+        start, end = bounds
+        # Das erste Intervall des Tages beginnt mit dem letzten Wert des Vortags
+        first = start - 1 if start else start
+        fingerprint = hash(
+            (self.epochs[first:end].tobytes(), self.power[first:end].tobytes())
+        )
+        self._day_fingerprints[day] = fingerprint
+        return fingerprint
+
+    def cumulative_at(self, timestamp: float) -> float:
+        """Return the energy (kWh) from the start of the forecast until a time."""
+        return interpolate_cumulative(
+            self.epochs, self.power, self.cumulative, timestamp
+        )
+
+    def energy_between(self, start: float, end: float) -> float:
+        """Return the predicted energy (kWh) between two timestamps."""
+        return self.cumulative_at(end) - self.cumulative_at(start)
+
+    def next_epoch_after(self, timestamp: float) -> int | None:
+        """Return the first sample time after a timestamp."""
+        i = bisect_right(self.epochs, timestamp)
+        return self.epochs[i] if i < len(self.epochs) else None
+
+    def day_total(self, day: date) -> float | None:
+        """Return the predicted energy (kWh) of a local day."""
+        if (bounds := self._days.get(day)) is None:
+            return None
+        start, end = bounds
+        before = self.cumulative[start - 1] if start else self.cumulative[start]
+        return round(self.cumulative[end - 1] - before, 3)
+
+    def day_forecast(self, day: date) -> dict[str, dict[str, float]] | None:
+        """Return power and energy per interval of a local day."""
+        if (cached := self._day_forecasts.get(day)) is not None:
+            return cached
+        if (bounds := self._days.get(day)) is None:
+            return None
+        result = self.slice_forecast(*bounds)
+        self._day_forecasts[day] = result
+        return result
+
+    def slice_forecast(self, start: int, end: int) -> dict[str, dict[str, float]]:
+        """Return power and energy per hour for the offsets ``[start, end)``.
+
+        Each entry is keyed by a sample time and holds the power there and
+        the energy of the hour ending there. Below hourly resolution only
+        the samples on full local hours are listed.
+        """
+        epochs, power, cumulative = self.epochs, self.power, self.cumulative
+        result: dict[str, dict[str, float]] = {}
+        if 0 < self.step < 3600 and end > start:
+            shift = local_hour_shift(epochs[start])
+            for i in range(start, end):
+                if (epochs[i] + shift) % 3600:
+                    continue
+                result[str(epochs[i])] = {
+                    "power_kw": round(power[i], 3),
+                    "hourly_kwh": round(
+                        cumulative[i] - self.cumulative_at(epochs[i] - 3600), 3
+                    ),
+                }
+            return result
+        previous = cumulative[start - 1] if start else cumulative[start]
+        for i in range(start, end):
+            result[str(epochs[i])] = {
+                "power_kw": round(power[i], 3),
+                "hourly_kwh": round(cumulative[i] - previous, 3),
+            }
+            previous = cumulative[i]
+        return result
+
+    def scaled(self, factors: array) -> SolarForecast:
+        """Return a copy with power and energy scaled per sample.
+
+        ``factors[i]`` applies to the power at sample ``i`` and to the
+        interval that starts there.
+        """
+        epochs, power, cumulative = self.epochs, self.power, self.cumulative
+        scaled_power = array("d", power)
+        scaled_cumulative = array("d", cumulative)
+        total = cumulative[0] if cumulative else 0.0
+        for i in range(len(epochs)):
+            scaled_power[i] = power[i] * factors[i]
+            if i:
+                total += (cumulative[i] - cumulative[i - 1]) * factors[i - 1]
+                scaled_cumulative[i] = total
+        return SolarForecast(
+            epochs,
+            scaled_power,
+            scaled_cumulative,
+            hash((self.fingerprint, factors.tobytes())),
+            self.step,
+            self.gaps,
+        )
+
+    def wh_hours(self) -> dict[str, float]:
+        """Return the energy (Wh) per hour keyed by its ISO start time."""
+        if self._wh_hours is None:
+            hours, energy = self.hourly_energy()
+            self._wh_hours = {
+                dt_util.utc_from_timestamp(hour).isoformat(): round(kwh * 1000, 1)
+                for hour, kwh in zip(hours, energy, strict=True)
+            }
+        return self._wh_hours
+
+    def hourly_energy(self) -> tuple[array, array]:
+        """Return the start epochs and energy (kWh) of the full UTC hours covered."""
+        if self._hourly is None:
+            hours, energy = array("q"), array("d")
+            if len(self.epochs) > 1:
+                hour = -(-self.epochs[0] // 3600) * 3600
+                previous = self.cumulative_at(hour)
+                while hour + 3600 <= self.epochs[-1]:
+                    current = self.cumulative_at(hour + 3600)
+                    hours.append(hour)
+                    energy.append(current - previous)
+                    previous = current
+                    hour += 3600
+            self._hourly = (hours, energy)
+        return self._hourly
+
+    def best_window(
+        self, start: int, end: int, step: int, profile: tuple[float, ...]
+    ) -> tuple[int, float] | None:
+        """Return the start and self-consumed energy (kWh) of the best load window.
+
+        The load ``profile`` holds the power (kW) per ``step`` seconds. The
+        window maximises the sum of ``min(load, pv)`` between ``start`` and
+        ``end``. Results are cached for the lifetime of this forecast.
+
+        Consecutive equal load values form a run. Each distinct load level
+        takes one sliding pass over the PV grid that moves the windows of its
+        runs forward by one slot, adding ``min(load, pv)`` at the leading and
+        removing it at the trailing edge. Memory stays O(slots) for any
+        profile; time is O(slots * runs), linear in the search period for
+        the bounded profile length.
+        """
+        key = (start, end, step, profile)
+        if key in self._windows:
+            return self._windows[key]
+
+        slots = (end - start) // step
+        length = len(profile)
+        result: tuple[int, float] | None = None
+        if length and slots >= length:
+            hours = step / 3600
+            grid = [self.cumulative_at(start + k * step) for k in range(slots + 1)]
+            pv = [(grid[k + 1] - grid[k]) / hours for k in range(slots)]
+
+            # Abschnitte gleicher Last je Lastwert: (Anfang, Ende) im Profil
+            levels: dict[float, list[tuple[int, int]]] = {}
+            offset = 0
+            while offset < length:
+                load = profile[offset]
+                run_end = offset + 1
+                while run_end < length and profile[run_end] == load:
+                    run_end += 1
+                levels.setdefault(load, []).append((offset, run_end))
+                offset = run_end
+
+            count = slots - length + 1
+            totals = array("d", bytes(8 * count))
+            for load, runs in levels.items():
+                if load <= 0:
+                    continue
+                total = 0.0
+                for first, last in runs:
+                    for k in range(first, last):
+                        total += pv[k] if pv[k] < load else load
+                totals[0] += total
+                for slot in range(1, count):
+                    # Jedes Fenster um einen Slot weiterschieben
+                    for first, last in runs:
+                        lead, trail = pv[slot + last - 1], pv[slot + first - 1]
+                        total += (lead if lead < load else load) - (
+                            trail if trail < load else load
+                        )
+                    totals[slot] += total
+
+            best_slot, best_total = 0, totals[0]
+            for slot in range(1, count):
+                if totals[slot] > best_total + 1e-9:
+                    best_slot, best_total = slot, totals[slot]
+            result = (start + best_slot * step, best_total * hours)
+
+        if len(self._windows) >= MAX_CACHED_WINDOWS:
+            self._windows.clear()
+        self._windows[key] = result
+        return result
@@ -0,0 +1,103 @@
+"""Lightweight instrumentation for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import AbstractContextManager, nullcontext
+import time
+from typing import Any
+
+# Obergrenzen der Histogramm-Buckets in Millisekunden
+BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket timing histogram."""
+
+    __slots__ = ("buckets", "count", "total", "max", "last")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        """Add one observation."""
+        self.buckets[bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.last = value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram as a serializable dict."""
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "max_ms": round(self.max, 3),
+            "last_ms": round(self.last, 3),
+            "buckets": dict(zip(labels, self.buckets, strict=True)),
+        }
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self._histogram = histogram
+        self._started = 0.0
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._histogram.observe((time.perf_counter() - self._started) * 1000)
+
+
+class SolarPredictionMetrics:
+    """Per-stage timings and counters of one config entry.
+
+    Counters are plain integer increments and always on. Timings are only
+    taken when enabled; otherwise ``timer`` returns a shared no-op context.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self.histograms: dict[str, Histogram] = {}
+
+    def timer(self, stage: str) -> AbstractContextManager[None]:
+        """Return a context manager that times one stage."""
+        if not self.enabled:
+            return _NULL_TIMER
+        if (histogram := self.histograms.get(stage)) is None:
+            histogram = self.histograms[stage] = Histogram()
+        return _Timer(histogram)
+
+    def increment(self, counter: str) -> None:
+        """Increment a counter."""
+        self.counters[counter] += 1
+
+    def last_ms(self, stage: str) -> float | None:
+        """Return the last timing of a stage."""
+        if (histogram := self.histograms.get(stage)) is None or not histogram.count:
+            return None
+        return round(histogram.last, 3)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all metrics as a serializable dict."""
+        return {
+            "enabled": self.enabled,
+            "counters": dict(self.counters),
+            "timings": {
+                stage: histogram.as_dict()
+                for stage, histogram in self.histograms.items()
+            },
+        }
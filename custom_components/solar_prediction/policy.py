@@ -0,0 +1,89 @@
+"""Adaptive refresh policy for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from homeassistant.const import SUN_EVENT_SUNRISE, SUN_EVENT_SUNSET
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.sun import get_astral_event_date, get_astral_event_next
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_MAX_REQUESTS_PER_DAY,
+    CONF_NIGHT_PAUSE,
+    CONF_SUNRISE_LEAD_TIME,
+    DEFAULT_MAX_REQUESTS_PER_DAY,
+    DEFAULT_NIGHT_PAUSE,
+    DEFAULT_SUNRISE_LEAD_TIME,
+)
+
+
+class RefreshPolicy:
+    """Decides when the next API request is worth making.
+
+    Between sunset and a lead time before sunrise the forecast for the
+    coming day is not needed, so requests are postponed to the morning.
+    The number of requests per local day is capped, and one request is
+    reserved for the refresh shortly before production starts.
+    """
+
+    def __init__(self, hass: HomeAssistant, options: Mapping[str, Any]) -> None:
+        self.hass = hass
+        self.night_pause: bool = options.get(CONF_NIGHT_PAUSE, DEFAULT_NIGHT_PAUSE)
+        self.sunrise_lead = timedelta(
+            minutes=options.get(CONF_SUNRISE_LEAD_TIME, DEFAULT_SUNRISE_LEAD_TIME)
+        )
+        self.max_requests_per_day: int = options.get(
+            CONF_MAX_REQUESTS_PER_DAY, DEFAULT_MAX_REQUESTS_PER_DAY
+        )
+        self._day: date | None = None
+        self._requests_today = 0
+
+    @property
+    def requests_today(self) -> int:
+        """Return the number of requests made on the current local day."""
+        if self._day != dt_util.now().date():
+            return 0
+        return self._requests_today
+
+    def record_request(self) -> None:
+        """Count a request against the daily cap."""
+        today = dt_util.now().date()
+        if self._day != today:
+            self._day = today
+            self._requests_today = 0
+        self._requests_today += 1
+
+    def next_refresh(self, preferred: datetime) -> datetime:
+        """Return the point in time the next request should be made."""
+        target = max(preferred, dt_util.utcnow())
+        if self.night_pause:
+            # Nacht ist, wenn als Nächstes ein Sonnenaufgang und kein Untergang folgt
+            next_sunrise = get_astral_event_next(self.hass, SUN_EVENT_SUNRISE, target)
+            next_sunset = get_astral_event_next(self.hass, SUN_EVENT_SUNSET, target)
+            if next_sunrise < next_sunset and target < next_sunrise - self.sunrise_lead:
+                target = next_sunrise - self.sunrise_lead
+        if not self._within_budget(target):
+            day = dt_util.as_local(target).date()
+            slot = self._priority_slot(day)
+            if target >= slot or self._requests_today >= self.max_requests_per_day:
+                slot = self._priority_slot(day + timedelta(days=1))
+            target = slot
+        return target
+
+    def _within_budget(self, target: datetime) -> bool:
+        target_day = dt_util.as_local(target).date()
+        if target_day != self._day:
+            return True
+        reserved = 1 if target < self._priority_slot(target_day) else 0
+        return self._requests_today < self.max_requests_per_day - reserved
+
+    def _priority_slot(self, day: date) -> datetime:
+        """Return the refresh slot shortly before production starts on a day."""
+        sunrise = get_astral_event_date(self.hass, SUN_EVENT_SUNRISE, day)
+        if sunrise is None:
+            return dt_util.start_of_local_day(day)
+        return max(sunrise - self.sunrise_lead, dt_util.start_of_local_day(day))
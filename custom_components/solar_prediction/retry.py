@@ -0,0 +1,95 @@
+"""Backoff and circuit breaker for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+import random
+
+from aiohttp.client_exceptions import ClientResponseError
+
+from homeassistant.util import dt as dt_util
+
+from .scheduler import RequestBudgetExceeded
+
+BACKOFF_BASE = 30.0
+BACKOFF_MAX = 1800.0
+RATE_LIMIT_DEFAULT = 900.0
+CLIENT_ERROR_DELAY = 3900.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 3600.0
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds of a Retry-After header."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - dt_util.utcnow()).total_seconds())
+
+
+class CircuitBreaker:
+    """Retries transient errors quickly and stops hammering a failing API.
+
+    Network errors and 5xx answers are retried with capped exponential
+    backoff and jitter, 429 answers after the Retry-After delay. After
+    ``BREAKER_THRESHOLD`` consecutive failures the breaker opens and no
+    requests are made until the cooldown is over; then a single trial
+    request decides whether it closes again.
+    """
+
+    def __init__(self) -> None:
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.next_attempt: datetime | None = None
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be made now."""
+        if self.state != STATE_OPEN:
+            return True
+        if self.next_attempt is not None and dt_util.utcnow() < self.next_attempt:
+            return False
+        self.state = STATE_HALF_OPEN
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.next_attempt = None
+
+    def record_failure(self, err: Exception) -> datetime:
+        """Register a failed request and return the time of the next attempt."""
+        self.failures += 1
+        delay = self._delay(err)
+        if self.state == STATE_HALF_OPEN or self.failures >= BREAKER_THRESHOLD:
+            self.state = STATE_OPEN
+            delay = max(delay, BREAKER_COOLDOWN)
+        self.next_attempt = dt_util.utcnow() + timedelta(seconds=delay)
+        return self.next_attempt
+
+    def _delay(self, err: Exception) -> float:
+        if isinstance(err, RequestBudgetExceeded):
+            return err.retry_after
+        if isinstance(err, ClientResponseError):
+            if err.status == 429:
+                retry_after = parse_retry_after(
+                    err.headers.get("Retry-After") if err.headers else None
+                )
+                return RATE_LIMIT_DEFAULT if retry_after is None else retry_after
+            if 400 <= err.status < 500:
+                # Falsche Zugangsdaten o. Ä. lösen sich nicht durch schnelle Wiederholung
+                return CLIENT_ERROR_DELAY
+        backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.failures - 1))
+        return random.uniform(backoff / 2, backoff)
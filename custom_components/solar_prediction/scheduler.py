@@ -0,0 +1,174 @@
+"""Shared request scheduler for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict, deque
+from collections.abc import Callable
+import logging
+import random
+import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .api import async_fetch_forecast
+from .const import DATA_SCHEDULER, DOMAIN
+from .metrics import SolarPredictionMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_CONCURRENT_REQUESTS = 2
+TOKEN_DAILY_REQUEST_BUDGET = 100
+MIN_REQUEST_SPACING = 2.0
+REQUEST_JITTER = 30.0
+COALESCE_WINDOW = 60.0
+BUDGET_WINDOW = 86400.0
+
+type RequestKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+class RequestBudgetExceeded(HomeAssistantError):
+    """Error to indicate the daily request budget of a token is used up."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(
+            f"Daily request budget exhausted, next request in {int(retry_after)} s"
+        )
+        self.retry_after = retry_after
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> SolarPredictionRequestScheduler:
+    """Return the scheduler shared by all config entries."""
+    domain_data: dict[str, Any] = hass.data.setdefault(DOMAIN, {})
+    if (scheduler := domain_data.get(DATA_SCHEDULER)) is None:
+        scheduler = domain_data[DATA_SCHEDULER] = SolarPredictionRequestScheduler(hass)
+    return scheduler
+
+
+class SolarPredictionRequestScheduler:
+    """Spreads, coalesces and budgets the API requests of all config entries.
+
+    Identical requests (same token and parameters) that are in flight or were
+    answered within the last minute share one HTTP call. Each access token
+    has a daily budget, requests of one token are spaced apart and the total
+    number of concurrent requests is bounded.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._registrations: dict[str, int] = defaultdict(int)
+        self._requests: dict[str, deque[float]] = defaultdict(deque)
+        self._next_slot: dict[str, float] = {}
+        self._in_flight: dict[RequestKey, asyncio.Future[dict[str, Any]]] = {}
+        self._recent: dict[RequestKey, tuple[float, dict[str, Any]]] = {}
+
+    @callback
+    def async_register(self, access_token: str) -> CALLBACK_TYPE:
+        """Register a coordinator polling with this token."""
+        self._registrations[access_token] += 1
+
+        # Der Scheduler bleibt auch ohne Registrierungen bestehen, damit das
+        # Tagesbudget und der Coalescing-Cache ein Neuladen überdauern.
+        @callback
+        def _unregister() -> None:
+            self._registrations[access_token] -= 1
+            if self._registrations[access_token] <= 0:
+                del self._registrations[access_token]
+
+        return _unregister
+
+    def jitter(self, access_token: str) -> float:
+        """Return a random delay that spreads the polls of one token."""
+        return random.uniform(
+            0, REQUEST_JITTER * self._registrations.get(access_token, 1)
+        )
+
+    def remaining_budget(self, access_token: str) -> int:
+        """Return how many requests the token may still make today."""
+        self._prune(access_token, time.monotonic())
+        return TOKEN_DAILY_REQUEST_BUDGET - len(self._requests[access_token])
+
+    async def async_fetch(
+        self,
+        access_token: str,
+        params: dict[str, str],
+        metrics: SolarPredictionMetrics | None = None,
+        on_request: Callable[[], None] | None = None,
+    ) -> dict[str, Any]:
+        """Return the API response for the given request parameters.
+
+        ``on_request`` is called only if an HTTP request is actually made,
+        not when the response is shared with an identical request.
+        """
+        key: RequestKey = (access_token, tuple(sorted(params.items())))
+        recent = self._recent.get(key)
+        if recent is not None and time.monotonic() - recent[0] < COALESCE_WINDOW:
+            _LOGGER.debug("Reusing response of a coalesced request")
+            return recent[1]
+        if (future := self._in_flight.get(key)) is not None:
+            _LOGGER.debug("Joining an identical request in flight")
+            return await asyncio.shield(future)
+
+        future = self.hass.loop.create_future()
+        self._in_flight[key] = future
+        try:
+            data = await self._async_request(
+                access_token, params, metrics, on_request
+            )
+        except BaseException as err:
+            if not isinstance(err, Exception):
+                # Abbruch des auslösenden Aufrufs (Entladen, Stopp): die
+                # Wartenden erhalten einen Fehler statt ewig zu warten
+                err = HomeAssistantError("The shared API request was cancelled")
+            future.set_exception(err)
+            # Verhindert "exception was never retrieved", wenn niemand wartet
+            future.exception()
+            raise
+        else:
+            future.set_result(data)
+            self._recent = {
+                k: v
+                for k, v in self._recent.items()
+                if time.monotonic() - v[0] < COALESCE_WINDOW
+            }
+            self._recent[key] = (time.monotonic(), data)
+            return data
+        finally:
+            del self._in_flight[key]
+
+    async def _async_request(
+        self,
+        access_token: str,
+        params: dict[str, str],
+        metrics: SolarPredictionMetrics | None,
+        on_request: Callable[[], None] | None,
+    ) -> dict[str, Any]:
+        now = time.monotonic()
+        self._prune(access_token, now)
+        requests = self._requests[access_token]
+        if len(requests) >= TOKEN_DAILY_REQUEST_BUDGET:
+            raise RequestBudgetExceeded(requests[0] + BUDGET_WINDOW - now)
+
+        # Anfragen desselben Tokens zeitlich auseinanderziehen
+        slot = max(now, self._next_slot.get(access_token, now))
+        self._next_slot[access_token] = slot + MIN_REQUEST_SPACING
+        requests.append(slot)
+        if on_request is not None:
+            on_request()
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+        async with self._semaphore:
+            return await async_fetch_forecast(
+                async_get_clientsession(self.hass), params, metrics
+            )
+
+    def _prune(self, access_token: str, now: float) -> None:
+        requests = self._requests[access_token]
+        while requests and requests[0] <= now - BUDGET_WINDOW:
+            requests.popleft()
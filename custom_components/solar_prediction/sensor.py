@@ -1,8 +1,10 @@
 """Sensor platform for Solar Prediction."""
 
 from __future__ import annotations
+import abc
 import logging
-from datetime import datetime, timedelta
+from array import array
+from datetime import date, datetime, timedelta
 from typing import Any
 
 from homeassistant.components.sensor import (
@@ -10,15 +12,21 @@ from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorStateClass,
 )
-from homeassistant.const import UnitOfEnergy
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfEnergy, UnitOfPower, UnitOfTime
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import (
+    async_track_point_in_time,
+    async_track_point_in_utc_time,
+)
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
 
+from .aggregate import SolarPredictionAggregateCoordinator
 from .coordinator import SolarPredictionDataUpdateCoordinator
 from . import SolarPredictionConfigEntry
-from .const import DOMAIN
+from .entity import SolarPredictionEntity
+from .forecast import SolarForecast, format_gaps
+from .timeline import ForecastTimeline
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,36 +38,53 @@ async def async_setup_entry(
 ) -> None:
     """Set up the sensor platform."""
     coordinator = entry.runtime_data
+    if isinstance(coordinator, SolarPredictionAggregateCoordinator):
+        # Ohne eigene API-Anfragen gibt es nur die Prognosesensoren
+        async_add_entities(
+            [
+                SolarPredictionDailyTotalSensor(coordinator, "today"),
+                SolarPredictionDailyTotalSensor(coordinator, "tomorrow"),
+                SolarPredictionRemainingTodaySensor(coordinator),
+                SolarPredictionPowerNowSensor(coordinator),
+                SolarPredictionHourEnergySensor(coordinator, "current"),
+                SolarPredictionHourEnergySensor(coordinator, "next"),
+            ]
+        )
+        return
 
-    # Erstelle nur noch die drei Hauptsensoren
+    # Prognose-, Status- und Diagnosesensoren, korrigierte Werte nur mit Erzeugungssensor
     sensors_to_add: list[SensorEntity] = [
         SolarPredictionDailyTotalSensor(coordinator, "today"),
         SolarPredictionDailyTotalSensor(coordinator, "tomorrow"),
+        SolarPredictionRemainingTodaySensor(coordinator),
+        SolarPredictionPowerNowSensor(coordinator),
+        SolarPredictionHourEnergySensor(coordinator, "current"),
+        SolarPredictionHourEnergySensor(coordinator, "next"),
         SolarPredictionStatusSensor(coordinator),
+        SolarPredictionApiCallsSensor(coordinator),
+        SolarPredictionFetchDurationSensor(coordinator),
     ]
+    if coordinator.bias is not None:
+        sensors_to_add += [
+            SolarPredictionDailyTotalSensor(coordinator, "today", corrected=True),
+            SolarPredictionDailyTotalSensor(coordinator, "tomorrow", corrected=True),
+        ]
 
     async_add_entities(sensors_to_add)
 
 
-class SolarPredictionStatusSensor(
-    CoordinatorEntity[SolarPredictionDataUpdateCoordinator], SensorEntity
-):
+class SolarPredictionStatusSensor(SolarPredictionEntity, SensorEntity):
     """Represents a sensor for the API status."""
 
-    _attr_has_entity_name = True
     _attr_entity_registry_enabled_default = True
+    _unrecorded_attributes = frozenset(
+        {"forecast_updates_applied", "forecast_updates_skipped"}
+    )
 
     def __init__(self, coordinator: SolarPredictionDataUpdateCoordinator):
         super().__init__(coordinator)
         self._attr_unique_id = f"{coordinator.project}_status"
         self._attr_translation_key = "api_status"
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, coordinator.project)},
-            "name": f"Solar Prediction ({coordinator.project})",
-            "manufacturer": "solarprognose.de",
-            "model": "Cloud API",
-            "entry_type": "service",
-        }
 
     @property
     def native_value(self) -> str:
@@ -77,119 +102,357 @@ class SolarPredictionStatusSensor(
     def available(self) -> bool:
         return True
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        breaker = self.coordinator.breaker
+        return {
+            "stale": self.coordinator.stale,
+            "circuit_breaker": breaker.state,
+            "consecutive_failures": breaker.failures,
+            "next_attempt": (
+                breaker.next_attempt.isoformat() if breaker.next_attempt else None
+            ),
+            "forecast_updates_applied": self.coordinator.update_stats["applied"],
+            "forecast_updates_skipped": self.coordinator.update_stats["skipped"],
+        }
+
+
+class SolarPredictionApiCallsSensor(SolarPredictionEntity, SensorEntity):
+    """Represents a diagnostic sensor counting the API calls."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_icon = "mdi:counter"
+
+    def __init__(self, coordinator: SolarPredictionDataUpdateCoordinator):
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{coordinator.project}_api_calls"
+        self._attr_translation_key = "api_calls"
+
+    @property
+    def native_value(self) -> int:
+        return self.coordinator.metrics.counters["api_calls"]
 
-class SolarPredictionDailyTotalSensor(
-    CoordinatorEntity[SolarPredictionDataUpdateCoordinator], SensorEntity
-):
+    @property
+    def available(self) -> bool:
+        return True
+
+
+class SolarPredictionFetchDurationSensor(SolarPredictionEntity, SensorEntity):
+    """Represents a diagnostic sensor for the duration of the last API request."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_icon = "mdi:timer-outline"
+
+    def __init__(self, coordinator: SolarPredictionDataUpdateCoordinator):
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{coordinator.project}_fetch_duration"
+        self._attr_translation_key = "fetch_duration"
+
+    @property
+    def native_value(self) -> float | None:
+        return self.coordinator.metrics.last_ms("http")
+
+    @property
+    def available(self) -> bool:
+        return self.coordinator.metrics.enabled
+
+
+class SolarPredictionDailyTotalSensor(SolarPredictionEntity, SensorEntity):
     """Represents a sensor for total daily solar prediction."""
 
     _attr_device_class = SensorDeviceClass.ENERGY
     _attr_state_class = SensorStateClass.TOTAL
     _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
     _attr_icon = "mdi:solar-power"
-    _attr_has_entity_name = True
+    # Die Kurve wird über den Dienst get_forecast bereitgestellt
+    _unrecorded_attributes = frozenset({"hourly_forecast"})
 
-    def __init__(self, coordinator: SolarPredictionDataUpdateCoordinator, day: str):
+    def __init__(
+        self,
+        coordinator: (
+            SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator
+        ),
+        day: str,
+        corrected: bool = False,
+    ):
         super().__init__(coordinator)
         self._day = day
-        self._attr_unique_id = f"{coordinator.project}_{day}_total"
-        self._attr_translation_key = f"{day}_total"
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, coordinator.project)},
-            "name": f"Solar Prediction ({coordinator.project})",
-            "manufacturer": "solarprognose.de",
-            "model": "Cloud API",
-            "entry_type": "service",
-        }
+        self._corrected = corrected
+        suffix = "_corrected" if corrected else ""
+        self._attr_unique_id = f"{coordinator.project}_{day}_total{suffix}"
+        self._attr_translation_key = f"{day}_total{suffix}"
+
+    def _forecast(self) -> SolarForecast:
+        if self._corrected:
+            return self.coordinator.corrected_forecast
+        return self.coordinator.forecast
+
+    def _target_date(self) -> date:
+        today = dt_util.now().date()
+        return today if self._day == "today" else today + timedelta(days=1)
+
+    def _state_key(self) -> tuple:
+        target_date = self._target_date()
+        return (
+            self.available,
+            target_date,
+            self._forecast().day_fingerprint(target_date),
+        )
 
     @property
     def native_value(self) -> float | None:
-        """Find the last cumulative kWh value of the day."""
-        forecast_data = self.coordinator.data and self.coordinator.data.get("data")
-        if not forecast_data:
+        """Return the predicted energy of the day."""
+        if not self.coordinator.data:
             return None
-        try:
-            hass_tz = dt_util.get_time_zone(self.hass.config.time_zone)
-            today_in_tz = dt_util.now(hass_tz).date()
-            target_date = (
-                today_in_tz if self._day == "today" else today_in_tz + timedelta(days=1)
-            )
+        with self.coordinator.metrics.timer("sensor_native_value"):
+            total = self._forecast().day_total(self._target_date())
+        return 0.0 if total is None else total
 
-            last_timestamp = 0
-            for ts_str in forecast_data.keys():
-                ts = int(ts_str)
-                timestamp_dt = dt_util.as_local(dt_util.utc_from_timestamp(ts))
-                if timestamp_dt.date() == target_date and ts > last_timestamp:
-                    last_timestamp = ts
-
-            if last_timestamp > 0:
-                values = forecast_data[str(last_timestamp)]
-                if len(values) > 2:
-                    final_value = values[2]
-                else:
-                    final_value = values[1]
-                return round(float(final_value), 3)
-            return 0.0
-        except (ValueError, KeyError, IndexError) as e:
-            _LOGGER.error("Error calculating daily total for %s: %s", self.name, e)
+    @property
+    def available(self) -> bool:
+        return self.coordinator.last_update_success or self.coordinator.data is not None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return power and energy per interval of the day."""
+        if not self.coordinator.data:
             return None
+        forecast = self._forecast()
+        target_date = self._target_date()
+        with self.coordinator.metrics.timer("sensor_attributes"):
+            daily_forecast = forecast.day_forecast(target_date)
+        if not daily_forecast:
+            return None
+        attributes: dict[str, Any] = {"hourly_forecast": daily_forecast}
+        # Nur bei fehlenden Stützstellen, dort wurde linear interpoliert
+        if gaps := forecast.day_gaps(target_date):
+            attributes["gaps"] = format_gaps(gaps)
+        return attributes
+
+
+class SolarPredictionRemainingTodaySensor(SolarPredictionEntity, SensorEntity):
+    """Represents a sensor for the predicted energy from now until midnight."""
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_icon = "mdi:solar-power-variant"
+
+    def __init__(
+        self,
+        coordinator: (
+            SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator
+        ),
+    ):
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{coordinator.project}_remaining_today"
+        self._attr_translation_key = "remaining_today"
+        self._unsub_boundary: CALLBACK_TYPE | None = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._schedule_next_boundary()
+
+    async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
+        if self._unsub_boundary:
+            self._unsub_boundary()
+            self._unsub_boundary = None
+
+    def _state_key(self) -> tuple:
+        return (self.available, self.coordinator.forecast.fingerprint, self.native_value)
 
     @property
     def available(self) -> bool:
         return self.coordinator.last_update_success or self.coordinator.data is not None
 
     @property
-    def extra_state_attributes(self) -> dict[str, Any] | None:
-        """Filters attributes per day AND calculates the hourly delta value."""
-        forecast_data = self.coordinator.data and self.coordinator.data.get("data")
-        if not forecast_data:
+    def native_value(self) -> float | None:
+        """Return the predicted energy between now and the end of the day."""
+        if not self.coordinator.data:
             return None
-        try:
-            hass_tz = dt_util.get_time_zone(self.hass.config.time_zone)
-            today_in_tz = dt_util.now(hass_tz).date()
-            target_date = (
-                today_in_tz if self._day == "today" else today_in_tz + timedelta(days=1)
+        now = dt_util.now()
+        midnight = dt_util.start_of_local_day(now.date() + timedelta(days=1))
+        with self.coordinator.metrics.timer("sensor_native_value"):
+            remaining = self.coordinator.forecast.energy_between(
+                now.timestamp(), midnight.timestamp()
             )
+        return round(max(remaining, 0.0), 3)
 
-            daily_timestamps = sorted(
-                [
-                    ts_str
-                    for ts_str in forecast_data
-                    if dt_util.as_local(dt_util.utc_from_timestamp(int(ts_str))).date()
-                    == target_date
-                ],
-                key=int,
-            )
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._schedule_next_boundary()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _schedule_next_boundary(self) -> None:
+        """Update again at the next forecast sample or at midnight."""
+        if self._unsub_boundary:
+            self._unsub_boundary()
+        now = dt_util.now()
+        boundary = dt_util.start_of_local_day(now.date() + timedelta(days=1))
+        next_epoch = self.coordinator.forecast.next_epoch_after(now.timestamp())
+        if next_epoch is not None and next_epoch < boundary.timestamp():
+            boundary = dt_util.utc_from_timestamp(next_epoch)
+        self._unsub_boundary = async_track_point_in_utc_time(
+            self.hass, self._async_handle_boundary, boundary
+        )
+
+    @callback
+    def _async_handle_boundary(self, _now) -> None:
+        self._unsub_boundary = None
+        self._schedule_next_boundary()
+        self._last_state_key = self._state_key()
+        self.async_write_ha_state()
+
+
+class SolarPredictionTimelineSensor(SolarPredictionEntity, SensorEntity, abc.ABC):
+    """Base for sensors whose value only changes at a timeline boundary.
+
+    The position in the boundary series is located once per timeline. A
+    point-in-time listener then advances it at each boundary, so there are
+    no wake-ups in between and an update is a single array lookup.
+    """
+
+    # Der angezeigte Wert liegt so viele Einträge nach der aktuellen Position
+    _value_offset = 0
+
+    def __init__(
+        self,
+        coordinator: (
+            SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator
+        ),
+    ):
+        super().__init__(coordinator)
+        self._timeline: ForecastTimeline | None = None
+        self._index = -1
+        self._unsub_boundary: CALLBACK_TYPE | None = None
+
+    @abc.abstractmethod
+    def _series(self, timeline: ForecastTimeline) -> tuple[array, array]:
+        """Return the boundaries and the values that apply from each."""
+
+    async def async_added_to_hass(self) -> None:
+        self._locate()
+        await super().async_added_to_hass()
+
+    async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
+        if self._unsub_boundary:
+            self._unsub_boundary()
+            self._unsub_boundary = None
+
+    def _state_key(self) -> tuple:
+        return (self.available, self.native_value)
+
+    @property
+    def available(self) -> bool:
+        return self.coordinator.last_update_success or self.coordinator.data is not None
 
-            if not daily_timestamps:
-                return None
-
-            daily_forecast_transformed = {}
-            first_ts_of_day = int(daily_timestamps[0])
-            ts_before_first = str(first_ts_of_day - 3600)
-            previous_cumulative_kwh = 0.0
-            if ts_before_first in forecast_data:
-                prev_values = forecast_data[ts_before_first]
-                previous_cumulative_kwh = float(
-                    prev_values[2] if len(prev_values) > 2 else prev_values[1]
-                )
-
-            for ts_str in daily_timestamps:
-                values = forecast_data[ts_str]
-                current_cumulative_kwh = float(
-                    values[2] if len(values) > 2 else values[1]
-                )
-
-                hourly_kwh = current_cumulative_kwh - previous_cumulative_kwh
-                if hourly_kwh < 0:
-                    hourly_kwh = current_cumulative_kwh
-
-                daily_forecast_transformed[ts_str] = {
-                    "power_kw": round(float(values[1]), 3),
-                    "hourly_kwh": round(hourly_kwh, 3),
-                }
-                previous_cumulative_kwh = current_cumulative_kwh
-            return {"hourly_forecast": daily_forecast_transformed}
-        except (ValueError, KeyError, IndexError) as e:
-            _LOGGER.error("Error calculating daily attributes for %s: %s", self.name, e)
+    @property
+    def native_value(self) -> float | None:
+        if not self.coordinator.data or self._timeline is None:
+            return None
+        _, values = self._series(self._timeline)
+        index = self._index + self._value_offset
+        if self._index < 0 or index >= len(values):
             return None
+        return round(values[index], 3)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Nur eine neue Prognose verschiebt die Position
+        if self.coordinator.timeline is not self._timeline:
+            self._locate()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _locate(self) -> None:
+        self._timeline = self.coordinator.timeline
+        boundaries, _ = self._series(self._timeline)
+        self._index = ForecastTimeline.locate(
+            boundaries, dt_util.utcnow().timestamp()
+        )
+        self._schedule_next_boundary()
+
+    @callback
+    def _schedule_next_boundary(self) -> None:
+        if self._unsub_boundary:
+            self._unsub_boundary()
+            self._unsub_boundary = None
+        boundaries, _ = self._series(self._timeline)
+        if self._index + 1 < len(boundaries):
+            self._unsub_boundary = async_track_point_in_time(
+                self.hass,
+                self._async_handle_boundary,
+                dt_util.utc_from_timestamp(boundaries[self._index + 1]),
+            )
+
+    @callback
+    def _async_handle_boundary(self, _now: datetime) -> None:
+        self._unsub_boundary = None
+        boundaries, _ = self._series(self._timeline)
+        self._index += 1
+        # Nach einem Zeitsprung die übersprungenen Grenzen nachholen. Der
+        # Listener erhält den geplanten Zeitpunkt, daher die aktuelle Uhrzeit.
+        timestamp = dt_util.utcnow().timestamp()
+        while (
+            self._index + 1 < len(boundaries)
+            and boundaries[self._index + 1] <= timestamp
+        ):
+            self._index += 1
+        self._schedule_next_boundary()
+        state_key = self._state_key()
+        if state_key == self._last_state_key:
+            self.coordinator.metrics.increment("skipped_writes")
+            return
+        self._last_state_key = state_key
+        self.async_write_ha_state()
+
+
+class SolarPredictionPowerNowSensor(SolarPredictionTimelineSensor):
+    """Represents a sensor for the forecast power of the current interval."""
+
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
+    _attr_icon = "mdi:solar-power"
+
+    def __init__(
+        self,
+        coordinator: (
+            SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator
+        ),
+    ):
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{coordinator.project}_power_now"
+        self._attr_translation_key = "power_now"
+
+    def _series(self, timeline: ForecastTimeline) -> tuple[array, array]:
+        return timeline.samples, timeline.power
+
+
+class SolarPredictionHourEnergySensor(SolarPredictionTimelineSensor):
+    """Represents a sensor for the predicted energy of the current or next hour."""
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_icon = "mdi:solar-power-variant"
+
+    def __init__(
+        self,
+        coordinator: (
+            SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator
+        ),
+        hour: str,
+    ):
+        super().__init__(coordinator)
+        self._value_offset = 1 if hour == "next" else 0
+        self._attr_unique_id = f"{coordinator.project}_energy_{hour}_hour"
+        self._attr_translation_key = f"energy_{hour}_hour"
+
+    def _series(self, timeline: ForecastTimeline) -> tuple[array, array]:
+        return timeline.hours, timeline.hour_energy
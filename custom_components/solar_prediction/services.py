@@ -0,0 +1,237 @@
+"""Services for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+import math
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_CORRECTED,
+    ATTR_DAY,
+    ATTR_DURATION,
+    ATTR_EARLIEST_START,
+    ATTR_END,
+    ATTR_HOUR,
+    ATTR_LATEST_END,
+    ATTR_LEAD_TIME,
+    ATTR_POWER_KW,
+    ATTR_PROFILE,
+    ATTR_PROFILE_STEP,
+    ATTR_START,
+    DOMAIN,
+    SERVICE_FIND_BEST_WINDOW,
+    SERVICE_GET_ARCHIVED_FORECAST,
+    SERVICE_GET_FORECAST,
+    SERVICE_QUERY_ENERGY,
+)
+
+from .forecast import format_gaps
+
+if TYPE_CHECKING:
+    from .aggregate import SolarPredictionAggregateCoordinator
+    from .coordinator import SolarPredictionDataUpdateCoordinator
+
+GET_FORECAST_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_DAY): vol.In(["today", "tomorrow"]),
+        vol.Optional(ATTR_CORRECTED, default=False): cv.boolean,
+    }
+)
+
+QUERY_ENERGY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Required(ATTR_END): cv.datetime,
+    }
+)
+
+FIND_BEST_WINDOW_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+            vol.Exclusive(ATTR_POWER_KW, "load"): vol.All(
+                vol.Coerce(float), vol.Range(min=0, min_included=False)
+            ),
+            vol.Exclusive(ATTR_PROFILE, "load"): vol.All(
+                cv.ensure_list,
+                vol.Length(min=1, max=96),
+                [vol.All(vol.Coerce(float), vol.Range(min=0))],
+            ),
+            vol.Optional(ATTR_DURATION): cv.positive_time_period,
+            vol.Optional(ATTR_PROFILE_STEP, default=timedelta(minutes=15)): vol.All(
+                cv.positive_time_period, vol.Range(min=timedelta(minutes=1))
+            ),
+            vol.Optional(ATTR_EARLIEST_START): cv.datetime,
+            vol.Optional(ATTR_LATEST_END): cv.datetime,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_POWER_KW, ATTR_PROFILE),
+)
+
+GET_ARCHIVED_FORECAST_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_HOUR): cv.datetime,
+        vol.Optional(ATTR_LEAD_TIME, default=24): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=24 * 14)
+        ),
+    }
+)
+
+
+def _get_coordinator(
+    hass: HomeAssistant, call: ServiceCall
+) -> SolarPredictionDataUpdateCoordinator | SolarPredictionAggregateCoordinator:
+    """Return the coordinator of the config entry addressed by a service call."""
+    entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(f"Unknown Solar Prediction entry: {entry_id}")
+    if entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(f"Solar Prediction entry {entry_id} is not loaded")
+    return entry.runtime_data
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Solar Prediction services."""
+
+    @callback
+    def async_get_forecast(call: ServiceCall) -> ServiceResponse:
+        """Return the in-memory forecast without touching the state machine."""
+        coordinator = _get_coordinator(hass, call)
+        forecast = coordinator.forecast
+        if call.data[ATTR_CORRECTED]:
+            if coordinator.bias is None:
+                raise ServiceValidationError("No production sensor is configured")
+            forecast = coordinator.corrected_forecast
+        if (day := call.data.get(ATTR_DAY)) is None:
+            hourly_forecast = forecast.slice_forecast(0, len(forecast))
+            gaps = [(forecast.epochs[i - 1], forecast.epochs[i]) for i in forecast.gaps]
+        else:
+            target_date = dt_util.now().date()
+            if day == "tomorrow":
+                target_date += timedelta(days=1)
+            hourly_forecast = forecast.day_forecast(target_date) or {}
+            gaps = forecast.day_gaps(target_date)
+        return {"hourly_forecast": hourly_forecast, "gaps": format_gaps(gaps)}
+
+    @callback
+    def async_query_energy(call: ServiceCall) -> ServiceResponse:
+        """Return the predicted energy between two points in time."""
+        forecast = _get_coordinator(hass, call).forecast
+        start = dt_util.as_local(call.data.get(ATTR_START) or dt_util.now())
+        end = dt_util.as_local(call.data[ATTR_END])
+        if end < start:
+            raise ServiceValidationError("The end must not be before the start")
+        energy = forecast.energy_between(start.timestamp(), end.timestamp())
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "energy_kwh": round(energy, 3),
+            "gaps": format_gaps(
+                forecast.gaps_between(start.timestamp(), end.timestamp())
+            ),
+        }
+
+    @callback
+    def async_find_best_window(call: ServiceCall) -> ServiceResponse:
+        """Return the window that covers most of a load with solar energy."""
+        forecast = _get_coordinator(hass, call).forecast
+        step = int(call.data[ATTR_PROFILE_STEP].total_seconds())
+        if (profile := call.data.get(ATTR_PROFILE)) is None:
+            if (duration := call.data.get(ATTR_DURATION)) is None:
+                raise ServiceValidationError("A constant load needs a duration")
+            profile = [call.data[ATTR_POWER_KW]] * max(
+                1, math.ceil(duration.total_seconds() / step)
+            )
+        if not len(forecast):
+            raise ServiceValidationError("No forecast available")
+
+        # Auf das Raster runden, damit wiederholte Aufrufe den Cache treffen
+        earliest = call.data.get(ATTR_EARLIEST_START) or dt_util.now()
+        start = math.ceil(dt_util.as_local(earliest).timestamp() / step) * step
+        latest = call.data.get(ATTR_LATEST_END)
+        end = int(dt_util.as_local(latest).timestamp()) if latest else forecast.epochs[-1]
+        result = forecast.best_window(start, end, step, tuple(profile))
+        if result is None:
+            raise ServiceValidationError("The load does not fit into the given period")
+
+        window_start, self_consumed = result
+        window_end = window_start + len(profile) * step
+        load_energy = sum(profile) * step / 3600
+        return {
+            "start": dt_util.as_local(dt_util.utc_from_timestamp(window_start)).isoformat(),
+            "end": dt_util.as_local(dt_util.utc_from_timestamp(window_end)).isoformat(),
+            "self_consumed_kwh": round(self_consumed, 3),
+            "load_kwh": round(load_energy, 3),
+            "solar_coverage": (
+                round(self_consumed / load_energy, 3) if load_energy else None
+            ),
+        }
+
+    async def async_get_archived_forecast(call: ServiceCall) -> ServiceResponse:
+        """Return the forecast of an hour as issued a given time ahead."""
+        archive = _get_coordinator(hass, call).archive
+        if archive is None:
+            raise ServiceValidationError("Aggregate entries have no forecast archive")
+        if not archive.enabled:
+            raise ServiceValidationError("The forecast archive is disabled")
+        hour = dt_util.as_local(call.data[ATTR_HOUR]).replace(
+            minute=0, second=0, microsecond=0
+        )
+        result = await archive.async_lookup(
+            int(hour.timestamp()), call.data[ATTR_LEAD_TIME] * 3600
+        )
+        if result is None:
+            raise ServiceValidationError(
+                f"No archived forecast for {hour.isoformat()} with this lead time"
+            )
+        return {"hour": hour.isoformat(), **result}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_ARCHIVED_FORECAST,
+        async_get_archived_forecast,
+        schema=GET_ARCHIVED_FORECAST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_BEST_WINDOW,
+        async_find_best_window,
+        schema=FIND_BEST_WINDOW_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_ENERGY,
+        async_query_energy,
+        schema=QUERY_ENERGY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_FORECAST,
+        async_get_forecast,
+        schema=GET_FORECAST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,168 @@
+"""Long-term statistics import for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+import logging
+from typing import Any
+
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+from homeassistant.util.unit_conversion import EnergyConverter
+
+from .const import DOMAIN
+from .forecast import SolarForecast
+from .metrics import SolarPredictionMetrics
+
+_LOGGER = logging.getLogger(__name__)
+STATISTICS_VERSION = 1
+# Bereits importierte Stunden vor dem Prognosebeginn, die gemerkt werden
+KEEP_HOURS = 48
+# Kleinere Abweichungen gelten nicht als Änderung
+ENERGY_TOLERANCE = 1e-4
+
+
+def statistic_id(project: str) -> str:
+    """Return the external statistic id of a project."""
+    return f"{DOMAIN}:{slugify(project)}_forecast_energy"
+
+
+async def async_remove_statistics_state(
+    hass: HomeAssistant, config_entry_id: str
+) -> None:
+    """Delete the import watermark of a removed config entry."""
+    await Store(
+        hass, STATISTICS_VERSION, f"{DOMAIN}_{config_entry_id}_statistics"
+    ).async_remove()
+
+
+class ForecastStatistics:
+    """Writes the hourly forecast energy as an external statistic.
+
+    Every fetched forecast is imported with a single batched call. The
+    hours written last time are remembered together with their running
+    sum (the watermark); a new import starts at the first hour whose energy
+    differs and continues the sum from there, so unchanged hours are never
+    written again.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry_id: str,
+        project: str,
+        metrics: SolarPredictionMetrics,
+    ) -> None:
+        self.hass = hass
+        self._metrics = metrics
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STATISTICS_VERSION, f"{DOMAIN}_{config_entry_id}_statistics"
+        )
+        self._metadata = StatisticMetaData(
+            mean_type=StatisticMeanType.NONE,
+            has_sum=True,
+            name=f"Solar Prediction {project} forecast",
+            source=DOMAIN,
+            statistic_id=statistic_id(project),
+            unit_class=EnergyConverter.UNIT_CLASS,
+            unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        )
+        self._loaded = False
+        self._hours = array("q")
+        self._energy = array("d")
+        self._sums = array("d")
+
+    @property
+    def statistic_id(self) -> str:
+        """Return the id of the imported statistic."""
+        return self._metadata["statistic_id"]
+
+    @property
+    def watermark(self) -> int | None:
+        """Return the start of the last imported hour."""
+        return self._hours[-1] if self._hours else None
+
+    async def async_import(self, forecast: SolarForecast) -> int:
+        """Import the changed hours of a forecast, return the number written."""
+        if not self._loaded:
+            await self._async_load()
+        hours, energy = forecast.hourly_energy()
+        if not hours:
+            return 0
+
+        # Erste Stunde, die neu ist oder sich gegenüber dem letzten Import geändert hat
+        first = len(hours)
+        offset = bisect_left(self._hours, hours[0])
+        for i, hour in enumerate(hours):
+            j = offset + i
+            if (
+                j >= len(self._hours)
+                or self._hours[j] != hour
+                or abs(self._energy[j] - energy[i]) > ENERGY_TOLERANCE
+            ):
+                first = i
+                break
+        if first == len(hours):
+            self._metrics.increment("statistics_unchanged")
+            return 0
+
+        # Die Summe ab der letzten unveränderten Stunde fortsetzen
+        keep = bisect_left(self._hours, hours[first])
+        total = self._sums[keep - 1] if keep else 0.0
+        rows: list[StatisticData] = []
+        new_sums = array("d")
+        for i in range(first, len(hours)):
+            total += energy[i]
+            new_sums.append(total)
+            rows.append(
+                StatisticData(
+                    start=dt_util.utc_from_timestamp(hours[i]),
+                    state=round(energy[i], 4),
+                    sum=round(total, 4),
+                )
+            )
+        with self._metrics.timer("statistics_import"):
+            async_add_external_statistics(self.hass, self._metadata, rows)
+        self._metrics.increment("statistics_imports")
+
+        trim = max(0, bisect_left(self._hours, hours[0] - KEEP_HOURS * 3600))
+        trim = min(trim, keep)
+        self._hours = self._hours[trim:keep] + hours[first:]
+        self._energy = self._energy[trim:keep] + energy[first:]
+        self._sums = self._sums[trim:keep] + new_sums
+        self._store.async_delay_save(self._data_to_save, 10)
+        _LOGGER.debug(
+            "Imported %s forecast hours into %s", len(rows), self.statistic_id
+        )
+        return len(rows)
+
+    async def _async_load(self) -> None:
+        self._loaded = True
+        stored = await self._store.async_load()
+        if not stored:
+            return
+        try:
+            hours = array("q", stored["hours"])
+            energy = array("d", stored["energy"])
+            sums = array("d", stored["sums"])
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.warning("Discarding malformed statistics watermark")
+            return
+        if len(hours) == len(energy) == len(sums):
+            self._hours, self._energy, self._sums = hours, energy, sums
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "hours": list(self._hours),
+            "energy": [round(value, 4) for value in self._energy],
+            "sums": [round(value, 4) for value in self._sums],
+        }
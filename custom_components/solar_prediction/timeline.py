@@ -0,0 +1,47 @@
+"""Precomputed boundary timeline for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+
+from .forecast import SolarForecast, local_hour_shift
+
+
+class ForecastTimeline:
+    """Boundaries of a forecast and the values that apply from each of them.
+
+    Built once per applied forecast. ``hours`` holds the local full hours of
+    the horizon and ``hour_energy`` the energy (kWh) of the hour starting
+    there; ``samples`` and ``power`` are the sample times and the power
+    (kW) of the forecast itself. Sensors locate their position once per
+    timeline and then step it forward at each boundary, so an update is a
+    plain array lookup.
+    """
+
+    __slots__ = ("hours", "hour_energy", "samples", "power")
+
+    def __init__(self, forecast: SolarForecast) -> None:
+        self.samples = forecast.epochs
+        self.power = forecast.power
+        self.hours = array("q")
+        self.hour_energy = array("d")
+        epochs = forecast.epochs
+        if len(epochs) < 2:
+            return
+
+        # Volle lokale Stunden, auch in Zeitzonen mit halbstündigem Versatz
+        shift = local_hour_shift(epochs[0])
+        hour = -(-(epochs[0] + shift) // 3600) * 3600 - shift
+        previous = forecast.cumulative_at(hour)
+        while hour + 3600 <= epochs[-1]:
+            current = forecast.cumulative_at(hour + 3600)
+            self.hours.append(hour)
+            self.hour_energy.append(current - previous)
+            previous = current
+            hour += 3600
+
+    @staticmethod
+    def locate(boundaries: array, timestamp: float) -> int:
+        """Return the index of the last boundary at or before a timestamp."""
+        return bisect_right(boundaries, timestamp) - 1
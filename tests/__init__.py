@@ -0,0 +1,24 @@
+"""Tests for the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def payload(start: int, step: int, powers: list[float]) -> dict[str, list[float]]:
+    """Return the ``data`` map of an API response with one power per step."""
+    return {
+        str(start + i * step): [start + i * step, power, 0.0]
+        for i, power in enumerate(powers)
+    }
+
+
+def api_response(
+    start: int, step: int, powers: list[float], next_request: int
+) -> dict[str, Any]:
+    """Return an API response with the given forecast and next request time."""
+    return {
+        "status": 0,
+        "preferredNextApiRequestAt": {"epochTimeUtc": next_request},
+        "data": payload(start, step, powers),
+    }
@@ -0,0 +1,34 @@
+"""Fixtures for the Solar Prediction tests."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components."""
+    return
+
+
+@pytest.fixture
+def with_recorder(recorder_mock, enable_custom_integrations):
+    """Start the recorder the integration depends on before the integration.
+
+    Override ``auto_enable_custom_integrations`` with this fixture in modules
+    that set up config entries, so the recorder is created before ``hass``.
+    """
+    return
+
+
+@pytest.fixture
+def mock_fetch():
+    """Answer every API request of the scheduler without network access."""
+    with patch(
+        "custom_components.solar_prediction.scheduler.async_fetch_forecast",
+        new_callable=AsyncMock,
+        return_value={"data": {}},
+    ) as fetch:
+        yield fetch
@@ -0,0 +1,182 @@
+"""Tests for the forecast history archive."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.solar_prediction.archive import (
+    ARCHIVE_MAGIC,
+    FILE_HEADER,
+    SolarForecastArchive,
+)
+from custom_components.solar_prediction.forecast import SolarForecast
+from custom_components.solar_prediction.metrics import SolarPredictionMetrics
+
+from . import payload
+
+# 2025-06-16 00:00 UTC
+START = 1_750_032_000
+HOUR = 3600
+
+
+def _archive(
+    hass: HomeAssistant, path: Path, retention_days: int = 30
+) -> SolarForecastArchive:
+    archive = SolarForecastArchive(
+        hass, "entry", retention_days, SolarPredictionMetrics(False)
+    )
+    archive.path = path
+    return archive
+
+
+def _forecast(start: int, powers: list[float]) -> SolarForecast:
+    return SolarForecast.from_api(payload(start, HOUR, powers))
+
+
+async def test_append_and_reload(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Appended revisions survive a reload of the archive file."""
+    path = tmp_path / "entry.archive"
+    archive = _archive(hass, path)
+    await archive.async_append(START, _forecast(START, [1.0, 2.0, 3.0]))
+    await archive.async_append(START + HOUR, _forecast(START + HOUR, [4.0, 5.0]))
+    await archive.async_close()
+    assert archive.revisions == 2
+    assert archive.size == path.stat().st_size
+
+    reloaded = _archive(hass, path)
+    await reloaded.async_load()
+    assert reloaded.revisions == 2
+    assert reloaded.size == archive.size
+    result = await reloaded.async_lookup(START + 2 * HOUR, 0)
+    assert result is not None
+    assert result["power_kw"] == 5.0
+    await reloaded.async_close()
+
+
+async def test_lookup_interpolates_and_selects_by_lead_time(
+    hass: HomeAssistant, tmp_path: Path
+) -> None:
+    """The newest revision issued at least lead_time ahead is interpolated."""
+    archive = _archive(hass, tmp_path / "entry.archive")
+    # Linear steigende Leistung, die spätere Revision verdoppelt sie
+    await archive.async_append(START, _forecast(START, [0.0, 2.0, 4.0, 6.0, 8.0]))
+    await archive.async_append(
+        START + 2 * HOUR, _forecast(START, [0.0, 4.0, 8.0, 12.0, 16.0])
+    )
+    target = START + 3 * HOUR + HOUR // 2
+
+    latest = await archive.async_lookup(target, HOUR)
+    assert latest is not None
+    issued_at = dt_util.utc_from_timestamp(START + 2 * HOUR)
+    assert latest["issued_at"] == issued_at.isoformat()
+    assert latest["lead_time_hours"] == 1.5
+    assert latest["power_kw"] == 14.0
+    # Integral von 4 kW/h * t zwischen 2,5 h und 3,5 h
+    assert latest["hourly_kwh"] == 12.0
+
+    earliest = await archive.async_lookup(target, 2 * HOUR)
+    assert earliest is not None
+    assert earliest["issued_at"] == dt_util.utc_from_timestamp(START).isoformat()
+    assert earliest["lead_time_hours"] == 3.5
+    assert earliest["power_kw"] == 7.0
+    assert earliest["hourly_kwh"] == 6.0
+
+    # Keine Revision weit genug im Voraus, Ziel außerhalb der Stützstellen
+    assert await archive.async_lookup(target, 4 * HOUR) is None
+    assert await archive.async_lookup(START + 5 * HOUR, 0) is None
+    await archive.async_close()
+
+
+async def test_compact_drops_revisions_past_retention(
+    hass: HomeAssistant, tmp_path: Path
+) -> None:
+    """Compaction rewrites the file without the revisions past the cutoff."""
+    path = tmp_path / "entry.archive"
+    archive = _archive(hass, path, retention_days=1)
+    now = int(dt_util.utcnow().timestamp())
+    for age in (3 * 86400, 2 * 86400, HOUR):
+        issued_at = now - age
+        await archive.async_append(issued_at, _forecast(issued_at, [1.0, 2.0]))
+    size = archive.size
+
+    await archive.async_compact()
+    assert archive.revisions == 1
+    assert archive.size == path.stat().st_size < size
+    assert not path.with_suffix(".tmp").exists()
+    result = await archive.async_lookup(now - HOUR, 0)
+    assert result is not None
+    assert result["power_kw"] == 1.0
+    await archive.async_close()
+
+    reloaded = _archive(hass, path, retention_days=1)
+    await reloaded.async_load()
+    assert reloaded.revisions == 1
+
+
+async def test_partial_trailing_revision_is_truncated(
+    hass: HomeAssistant, tmp_path: Path
+) -> None:
+    """An interrupted append is cut off when the archive is loaded."""
+    path = tmp_path / "entry.archive"
+    archive = _archive(hass, path)
+    await archive.async_append(START, _forecast(START, [1.0, 2.0]))
+    await archive.async_append(START + HOUR, _forecast(START + HOUR, [3.0, 4.0]))
+    size = archive.size
+    # Kopf und erste Spalte einer dritten Revision, die restlichen Spalten fehlen
+    partial = path.read_bytes()[FILE_HEADER.size : FILE_HEADER.size + 32]
+    with path.open("ab") as file:
+        file.write(partial)
+
+    reloaded = _archive(hass, path)
+    await reloaded.async_load()
+    assert reloaded.revisions == 2
+    assert reloaded.size == size
+    assert path.stat().st_size == size
+
+    await reloaded.async_append(START + 2 * HOUR, _forecast(START + 2 * HOUR, [5.0]))
+    result = await reloaded.async_lookup(START + 2 * HOUR, 0)
+    assert result is not None
+    assert result["power_kw"] == 5.0
+    await reloaded.async_close()
+
+
+async def test_foreign_file_is_moved_aside(
+    hass: HomeAssistant, tmp_path: Path
+) -> None:
+    """A foreign or newer file is renamed to .unknown instead of overwritten."""
+    aside = tmp_path / "entry.archive.unknown"
+    for content in (
+        b"not an archive file",
+        b"hi",
+        FILE_HEADER.pack(ARCHIVE_MAGIC, 2, 0) + b"\x00" * 16,
+    ):
+        path = tmp_path / "entry.archive"
+        path.write_bytes(content)
+        archive = _archive(hass, path)
+        await archive.async_load()
+        assert archive.revisions == 0
+        assert not path.exists()
+        assert aside.read_bytes() == content
+
+        # Danach beginnt eine neue Archivdatei
+        await archive.async_append(START, _forecast(START, [1.0]))
+        assert archive.revisions == 1
+        assert path.read_bytes().startswith(ARCHIVE_MAGIC)
+        await archive.async_close()
+        path.unlink()
+
+
+async def test_interrupted_header_is_discarded(
+    hass: HomeAssistant, tmp_path: Path
+) -> None:
+    """A file header cut off while the archive was created is discarded."""
+    path = tmp_path / "entry.archive"
+    path.write_bytes(ARCHIVE_MAGIC[:2])
+    archive = _archive(hass, path)
+    await archive.async_load()
+    assert path.exists()
+    assert path.stat().st_size == 0
+    assert not (tmp_path / "entry.archive.unknown").exists()
@@ -0,0 +1,130 @@
+"""Tests for the bias correction against a production sensor."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT, STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.solar_prediction.bias import BiasCorrection
+from custom_components.solar_prediction.forecast import SolarForecast
+
+from . import payload
+
+HOUR = 3600
+SENSOR = "sensor.pv_energy"
+DAY = date(2025, 6, 16)
+
+
+@pytest.fixture
+def midnight(hass: HomeAssistant) -> datetime:
+    """Return the local midnight the test forecast starts at."""
+    return dt_util.start_of_local_day(DAY)
+
+
+@pytest.fixture
+def forecast(midnight: datetime) -> SolarForecast:
+    """Return a forecast of 1 kW around the clock."""
+    return SolarForecast.from_api(
+        payload(int(midnight.timestamp()), HOUR, [1.0] * 25), fingerprint=1
+    )
+
+
+def _reading(hass: HomeAssistant, value: str, unit: str = "kWh") -> None:
+    hass.states.async_set(SENSOR, value, {ATTR_UNIT_OF_MEASUREMENT: unit})
+
+
+async def test_add_hour_learns_from_consecutive_readings(
+    hass: HomeAssistant, midnight: datetime, forecast: SolarForecast
+) -> None:
+    """Each full hour with a reading before and after adds one sample."""
+    bias = BiasCorrection(hass, "entry", SENSOR)
+
+    _reading(hass, "10.0")
+    assert not bias.async_add_hour(midnight + timedelta(hours=12), forecast)
+    _reading(hass, "12.0")
+    assert bias.async_add_hour(midnight + timedelta(hours=13, seconds=1), forecast)
+
+    assert bias.samples == 1
+    assert bias.hour_actual[12] == pytest.approx(2.0)
+    assert bias.hour_forecast[12] == pytest.approx(1.0)
+    assert bias.month_actual[DAY.month - 1] == pytest.approx(2.0)
+    assert bias.month_year[DAY.month - 1] == DAY.year
+    # Die Stunde lag über der Prognose, der Faktor auch
+    assert bias.factor(12, DAY.month) > 1.0
+
+    # Wh werden umgerechnet
+    _reading(hass, "13000", "Wh")
+    assert bias.async_add_hour(midnight + timedelta(hours=14), forecast)
+    assert bias.hour_actual[13] == pytest.approx(1.0)
+    assert bias.samples == 2
+
+
+@pytest.mark.parametrize(
+    ("value", "unit"),
+    [("9.0", "kWh"), (STATE_UNAVAILABLE, "kWh"), ("11.0", "m³")],
+)
+async def test_add_hour_skips_unusable_readings(
+    hass: HomeAssistant,
+    midnight: datetime,
+    forecast: SolarForecast,
+    value: str,
+    unit: str,
+) -> None:
+    """Resets, unavailable sensors and foreign units teach nothing."""
+    bias = BiasCorrection(hass, "entry", SENSOR)
+    _reading(hass, "10.0")
+    bias.async_add_hour(midnight + timedelta(hours=12), forecast)
+
+    _reading(hass, value, unit)
+    assert not bias.async_add_hour(midnight + timedelta(hours=13), forecast)
+    assert bias.samples == 0
+
+
+async def test_add_hour_needs_the_previous_hour(
+    hass: HomeAssistant, midnight: datetime, forecast: SolarForecast
+) -> None:
+    """A missed hour starts over instead of learning two hours at once."""
+    bias = BiasCorrection(hass, "entry", SENSOR)
+    _reading(hass, "10.0")
+    bias.async_add_hour(midnight + timedelta(hours=10), forecast)
+
+    _reading(hass, "14.0")
+    assert not bias.async_add_hour(midnight + timedelta(hours=12), forecast)
+    _reading(hass, "15.0")
+    assert bias.async_add_hour(midnight + timedelta(hours=13), forecast)
+    assert bias.hour_actual[12] == pytest.approx(1.0)
+
+
+async def test_corrected_is_cached_per_forecast_and_samples(
+    hass: HomeAssistant, midnight: datetime, forecast: SolarForecast
+) -> None:
+    """The corrected forecast is rebuilt only for a new forecast or sample."""
+    bias = BiasCorrection(hass, "entry", SENSOR)
+    _reading(hass, "10.0")
+    bias.async_add_hour(midnight + timedelta(hours=12), forecast)
+    _reading(hass, "13.0")
+    bias.async_add_hour(midnight + timedelta(hours=13), forecast)
+
+    corrected = bias.corrected(forecast)
+    assert bias.corrected(forecast) is corrected
+    for i, epoch in enumerate(forecast.epochs):
+        local = dt_util.as_local(dt_util.utc_from_timestamp(epoch))
+        assert corrected.power[i] == pytest.approx(
+            forecast.power[i] * bias.factor(local.hour, local.month)
+        )
+    assert corrected.fingerprint != forecast.fingerprint
+
+    # Ein neuer Wert ändert die Faktoren
+    _reading(hass, "14.0")
+    bias.async_add_hour(midnight + timedelta(hours=14), forecast)
+    assert bias.corrected(forecast) is not corrected
+
+    # Ebenso eine neue Prognose mit denselben Werten
+    again = bias.corrected(forecast)
+    other = SolarForecast(forecast.epochs, forecast.power, forecast.cumulative, 2)
+    assert bias.corrected(other) is not again
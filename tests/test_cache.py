@@ -0,0 +1,38 @@
+"""Tests for the write-through cache."""
+
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.solar_prediction.cache import SolarPredictionCache
+from custom_components.solar_prediction.metrics import SolarPredictionMetrics
+
+from . import api_response
+
+# 2025-06-16 00:00 UTC
+START = 1_750_032_000
+HOUR = 3600
+
+
+async def test_flush_is_timed_and_unchanged_payloads_are_skipped(
+    hass: HomeAssistant,
+) -> None:
+    """An unchanged payload is not saved again, a flush writes and is timed."""
+    metrics = SolarPredictionMetrics(True)
+    cache = SolarPredictionCache(hass, "entry", metrics)
+    response = api_response(START, HOUR, [1.0, 2.0], START + HOUR)
+
+    assert cache.async_set(response)
+    assert not cache.async_set(dict(response))
+    assert metrics.counters["skipped_saves"] == 1
+    # Ein neuer Abfragezeitpunkt allein ist eine Änderung
+    assert cache.async_set(api_response(START, HOUR, [1.0, 2.0], START + 2 * HOUR))
+
+    await cache.async_flush()
+    assert metrics.counters["store_writes"] == 1
+    assert metrics.histograms["store_flush"].count == 1
+    await cache.async_flush()
+    assert metrics.histograms["store_flush"].count == 1
+
+    reloaded = SolarPredictionCache(hass, "entry", SolarPredictionMetrics(False))
+    assert await reloaded.async_load() == cache.data
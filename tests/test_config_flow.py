@@ -0,0 +1,212 @@
+"""Tests for the config flow and the cache seed it leaves for the entry."""
+
+from __future__ import annotations
+
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from homeassistant.config_entries import SOURCE_USER, ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.solar_prediction.const import DATA_SEEDS, DOMAIN
+
+from . import api_response
+
+HOUR = 3600
+
+
+def _response(power: float) -> dict:
+    now = int(time.time()) // HOUR * HOUR
+    return api_response(now, HOUR, [power] * 4, now + 2 * HOUR)
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(with_recorder):
+    """Set up the recorder before the integration."""
+    return
+
+
+@pytest.fixture(autouse=True)
+def no_request_spacing():
+    """Let the validation follow the entry's own request without waiting."""
+    with patch("custom_components.solar_prediction.scheduler.MIN_REQUEST_SPACING", 0):
+        yield
+
+
+def _seeds(hass: HomeAssistant) -> dict:
+    return hass.data.get(DOMAIN, {}).get(DATA_SEEDS, {})
+
+
+async def _setup_entry(
+    hass: HomeAssistant, mock_fetch: AsyncMock, data: dict
+) -> MockConfigEntry:
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="project",
+        unique_id="project",
+        data={"access_token": "token", "project": "project"},
+    )
+    entry.add_to_hass(hass)
+    mock_fetch.return_value = data
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    mock_fetch.reset_mock()
+    return entry
+
+
+async def test_user_step_seeds_the_entry(
+    hass: HomeAssistant, mock_fetch: AsyncMock
+) -> None:
+    """The validation response fills the cache, setup makes no request."""
+    mock_fetch.return_value = response = _response(2.0)
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": SOURCE_USER}
+    )
+    assert result["type"] is FlowResultType.FORM
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"access_token": "token", "project": "project"}
+    )
+    await hass.async_block_till_done()
+
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    entry = result["result"]
+    assert entry.state is ConfigEntryState.LOADED
+    assert mock_fetch.await_count == 1
+    assert entry.runtime_data.data == response
+    assert not _seeds(hass)
+
+
+async def test_reauth_applies_the_new_token_in_place(
+    hass: HomeAssistant, mock_fetch: AsyncMock
+) -> None:
+    """A new token and its forecast are taken over without a reload."""
+    entry = await _setup_entry(hass, mock_fetch, _response(1.0))
+    coordinator = entry.runtime_data
+    mock_fetch.return_value = response = _response(3.0)
+
+    result = await entry.start_reauth_flow(hass)
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"access_token": "new-token"}
+    )
+    await hass.async_block_till_done()
+
+    assert result["type"] is FlowResultType.ABORT
+    assert result["reason"] == "reauth_successful"
+    assert entry.runtime_data is coordinator
+    assert coordinator.access_token == "new-token"
+    assert coordinator.data == response
+    assert mock_fetch.await_count == 1
+    assert not _seeds(hass)
+
+
+async def test_reauth_with_the_same_token_drops_the_seed(
+    hass: HomeAssistant, mock_fetch: AsyncMock
+) -> None:
+    """An unchanged entry leaves no seed behind for the next reload."""
+    entry = await _setup_entry(hass, mock_fetch, current := _response(1.0))
+    mock_fetch.return_value = _response(3.0)
+
+    result = await entry.start_reauth_flow(hass)
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"access_token": "token"}
+    )
+    await hass.async_block_till_done()
+
+    assert result["reason"] == "reauth_successful"
+    assert not _seeds(hass)
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert entry.runtime_data.data == current
+
+
+async def test_reconfigure_without_changes_drops_the_seed(
+    hass: HomeAssistant, mock_fetch: AsyncMock
+) -> None:
+    """Submitting the current data keeps the entry and discards the seed."""
+    entry = await _setup_entry(hass, mock_fetch, _response(1.0))
+    mock_fetch.return_value = _response(3.0)
+
+    result = await entry.start_reconfigure_flow(hass)
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"access_token": "token", "project": "project"}
+    )
+    await hass.async_block_till_done()
+
+    assert result["reason"] == "reconfigure_successful"
+    assert not _seeds(hass)
+
+
+async def test_reconfigure_seeds_the_reloaded_entry(
+    hass: HomeAssistant, mock_fetch: AsyncMock
+) -> None:
+    """A new project reloads the entry, which starts from the seed."""
+    entry = await _setup_entry(hass, mock_fetch, _response(1.0))
+    mock_fetch.return_value = response = _response(3.0)
+
+    result = await entry.start_reconfigure_flow(hass)
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"access_token": "token", "project": "other"}
+    )
+    await hass.async_block_till_done()
+
+    assert result["reason"] == "reconfigure_successful"
+    assert entry.unique_id == "other"
+    assert entry.runtime_data.project == "other"
+    assert entry.runtime_data.data == response
+    assert mock_fetch.await_count == 1
+    assert not _seeds(hass)
+
+
+async def test_aggregate_and_project_ids_do_not_collide(
+    hass: HomeAssistant, mock_fetch: AsyncMock
+) -> None:
+    """An aggregate may share its name with a project id and vice versa."""
+    members = []
+    for project in ("north", "south"):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            title=project,
+            unique_id=project,
+            data={"access_token": "token", "project": project},
+        )
+        entry.add_to_hass(hass)
+        members.append(entry.entry_id)
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": SOURCE_USER}
+    )
+    assert result["type"] is FlowResultType.MENU
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"next_step_id": "aggregate"}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"name": "north", "members": members}
+    )
+    await hass.async_block_till_done()
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert result["result"].unique_id == "aggregate_north"
+
+    # Ein Projekt mit dem Namen eines Aggregats lässt sich weiterhin anlegen
+    MockConfigEntry(
+        domain=DOMAIN,
+        title="east",
+        unique_id="aggregate_east",
+        data={"entry_type": "aggregate", "members": members},
+    ).add_to_hass(hass)
+    mock_fetch.return_value = _response(1.0)
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": SOURCE_USER}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"next_step_id": "project"}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"access_token": "token", "project": "east"}
+    )
+    await hass.async_block_till_done()
+    assert result["type"] is FlowResultType.CREATE_ENTRY
@@ -0,0 +1,71 @@
+"""Tests for the coordinator of a project entry."""
+
+from __future__ import annotations
+
+import time
+from unittest.mock import AsyncMock, patch
+
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.json import json_bytes
+from homeassistant.helpers.storage import Store
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.solar_prediction.const import DOMAIN
+
+from . import api_response
+
+HOUR = 3600
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(with_recorder):
+    """Set up the recorder before the integration."""
+    return
+
+
+async def test_only_unchanged_fetches_count_as_skipped(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, mock_fetch: AsyncMock
+) -> None:
+    """Loading the cache is no skip, an unchanged API answer is one."""
+    start = int(time.time()) // HOUR * HOUR
+    # Der Cache ist abgelaufen, die API-Antwort gilt eine Stunde
+    cached = api_response(start, HOUR, [1.0, 2.0, 1.0], start - HOUR)
+    response = api_response(start, HOUR, [1.0, 2.0, 1.0], start + HOUR)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="project",
+        data={"access_token": "token", "project": "project"},
+    )
+    entry.add_to_hass(hass)
+    await Store(hass, 1, f"{DOMAIN}_{entry.entry_id}").async_save(
+        {"data": cached, "type": "hourly"}
+    )
+    mock_fetch.return_value = response
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = entry.runtime_data
+
+    assert mock_fetch.await_count == 1
+    assert coordinator.update_stats == {"applied": 1, "skipped": 1}
+
+    # Die Prognose wird je Aktualisierung nur einmal serialisiert
+    freezer.tick(2 * HOUR)
+    with patch(
+        "custom_components.solar_prediction.forecast.json_bytes", wraps=json_bytes
+    ) as serialise:
+        await coordinator.async_refresh()
+    assert serialise.call_count == 1
+    assert coordinator.update_stats == {"applied": 1, "skipped": 2}
+
+    freezer.tick(2 * HOUR)
+    mock_fetch.return_value = api_response(start, HOUR, [1.0, 3.0, 1.0], start)
+    await coordinator.async_refresh()
+    assert coordinator.update_stats == {"applied": 2, "skipped": 2}
+    assert coordinator.forecast.power[1] == 3.0
+    assert mock_fetch.await_count == 3
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,197 @@
+"""Tests for the array-backed forecast model."""
+
+from __future__ import annotations
+
+from datetime import date
+
+from homeassistant.util import dt as dt_util
+import pytest
+
+from custom_components.solar_prediction.forecast import SolarForecast
+
+from . import payload
+
+# 2025-06-16 00:00 UTC
+START = 1_750_032_000
+HOUR = 3600
+QUARTER = 900
+
+
+def test_from_api_sorts_and_indexes_days() -> None:
+    """Samples are sorted once and each local day maps to its offsets."""
+    midnight = int(dt_util.start_of_local_day(date(2025, 6, 16)).timestamp())
+    data = payload(midnight, HOUR, [1.0] * 26)
+    forecast = SolarForecast.from_api(dict(reversed(list(data.items()))))
+
+    assert list(forecast.epochs) == sorted(forecast.epochs)
+    assert forecast.days() == [date(2025, 6, 16), date(2025, 6, 17)]
+    assert forecast.day_range(date(2025, 6, 16)) == (0, 24)
+    assert forecast.day_range(date(2025, 6, 17)) == (24, 26)
+    assert forecast.day_total(date(2025, 6, 16)) == pytest.approx(23.0)
+    assert forecast.day_total(date(2025, 6, 17)) == pytest.approx(2.0)
+    today = forecast.day_forecast(date(2025, 6, 17))
+    assert list(today) == [str(midnight + 24 * HOUR), str(midnight + 25 * HOUR)]
+    assert forecast.day_forecast(date(2025, 6, 17)) is today
+
+
+def test_from_api_integrates_trapezoids() -> None:
+    """The cumulative energy is the trapezoid sum over the intervals."""
+    forecast = SolarForecast.from_api(payload(START, HOUR, [0.0, 2.0, 2.0, 0.0]))
+
+    assert forecast.step == HOUR
+    assert list(forecast.cumulative) == pytest.approx([0.0, 1.0, 3.0, 4.0])
+    assert not forecast.gaps
+
+
+def test_from_api_sorts_and_drops_duplicates() -> None:
+    """Unordered samples are sorted and the last of equal timestamps is kept."""
+    data = {
+        "c": [START + 2 * HOUR, 1.0, 0.0],
+        "a": [START, 0.0, 0.0],
+        "b": [START + HOUR, 3.0, 0.0],
+        "b2": [START + HOUR, 2.0, 0.0],
+    }
+    forecast = SolarForecast.from_api(data)
+
+    assert list(forecast.epochs) == [START, START + HOUR, START + 2 * HOUR]
+    assert list(forecast.power) == [0.0, 2.0, 1.0]
+    assert forecast.step == HOUR
+    assert forecast.cumulative[-1] == pytest.approx(2.5)
+
+
+def test_from_api_flags_and_interpolates_gaps() -> None:
+    """Missing samples with power are bridged linearly and listed as gaps."""
+    data = payload(START, QUARTER, [4.0] * 5)
+    # Zwei Stunden ohne Stützstellen, danach weiter im 15-Minuten-Raster
+    resume = START + 4 * QUARTER + 2 * HOUR
+    data.update(payload(resume, QUARTER, [4.0] * 5))
+    forecast = SolarForecast.from_api(data)
+
+    assert forecast.step == QUARTER
+    assert len(forecast.gaps) == 1
+    gap = (START + 4 * QUARTER, resume)
+    assert forecast.gaps_between(START, resume + HOUR) == [gap]
+    assert forecast.gaps_between(resume, resume + HOUR) == []
+    # Die Lücke zählt mit der interpolierten Leistung, nicht mit null
+    assert forecast.energy_between(*gap) == pytest.approx(8.0)
+
+
+def test_from_api_ignores_night_gaps() -> None:
+    """A long interval between samples without power is not a gap."""
+    data = payload(START, QUARTER, [0.0, 0.0])
+    data.update(payload(START + 6 * HOUR, QUARTER, [0.0, 1.0, 2.0]))
+    forecast = SolarForecast.from_api(data)
+
+    assert not forecast.gaps
+    assert forecast.day_gaps(forecast.days()[0]) == []
+
+
+def test_cumulative_at_partial_interval() -> None:
+    """Partial intervals follow the linearly interpolated power."""
+    forecast = SolarForecast.from_api(payload(START, HOUR, [0.0, 4.0, 4.0]))
+
+    assert forecast.cumulative_at(START - HOUR) == 0.0
+    # Leistung steigt in der ersten halben Stunde von 0 auf 2 kW
+    assert forecast.cumulative_at(START + HOUR / 2) == pytest.approx(0.5)
+    assert forecast.cumulative_at(START + HOUR) == pytest.approx(2.0)
+    assert forecast.cumulative_at(START + 1.25 * HOUR) == pytest.approx(3.0)
+    assert forecast.cumulative_at(START + 5 * HOUR) == pytest.approx(6.0)
+    assert forecast.energy_between(
+        START + HOUR / 2, START + 1.25 * HOUR
+    ) == pytest.approx(2.5)
+
+
+def test_merged_adds_different_resolutions() -> None:
+    """Forecasts of different resolutions add up at the union of samples."""
+    hourly = SolarForecast.from_api(
+        payload(START, HOUR, [0.0, 2.0, 4.0, 2.0, 0.0]), fingerprint=1
+    )
+    quarter = SolarForecast.from_api(
+        payload(START, QUARTER, [float(i % 5) for i in range(17)]), fingerprint=2
+    )
+    merged = SolarForecast.merged([hourly, quarter])
+
+    assert list(merged.epochs) == list(quarter.epochs)
+    assert merged.step == QUARTER
+    assert merged.power[2] == pytest.approx(1.0 + 2.0)
+    for start, end in ((START, START + 4 * HOUR), (START + 1000, START + 9000)):
+        assert merged.energy_between(start, end) == pytest.approx(
+            hourly.energy_between(start, end) + quarter.energy_between(start, end)
+        )
+    assert merged.fingerprint == hash((1, 2))
+
+
+def test_merged_covers_common_horizon_and_keeps_gaps() -> None:
+    """The sum ends with the shortest forecast and keeps member gaps."""
+    long = SolarForecast.from_api(payload(START, HOUR, [1.0] * 7))
+    data = payload(START, QUARTER, [2.0] * 3)
+    data.update(payload(START + 2 * QUARTER + 2 * HOUR, QUARTER, [2.0] * 3))
+    short = SolarForecast.from_api(data)
+    merged = SolarForecast.merged([long, short, SolarForecast.from_api(None)])
+
+    assert merged.epochs[0] == START
+    assert merged.epochs[-1] == short.epochs[-1]
+    # Die Lücke ist durch die Stützstellen des stündlichen Projekts geteilt
+    gaps = merged.gaps_between(START, merged.epochs[-1])
+    assert gaps[0][0] == START + 2 * QUARTER
+    assert gaps[-1][1] == START + 2 * QUARTER + 2 * HOUR
+    assert all(a[1] == b[0] for a, b in zip(gaps, gaps[1:]))
+
+
+def test_merged_without_members() -> None:
+    """Merging nothing yields an empty forecast."""
+    merged = SolarForecast.merged([SolarForecast.from_api(None)])
+
+    assert len(merged) == 0
+    assert merged.cumulative_at(START) == 0.0
+
+
+def _brute_force_window(
+    forecast: SolarForecast, start: int, end: int, step: int, profile: list[float]
+) -> tuple[int, float]:
+    best: tuple[int, float] | None = None
+    slots = (end - start) // step
+    for slot in range(slots - len(profile) + 1):
+        total = 0.0
+        for offset, load in enumerate(profile):
+            begin = start + (slot + offset) * step
+            pv = forecast.energy_between(begin, begin + step) / (step / 3600)
+            total += min(load, pv) * step / 3600
+        if best is None or total > best[1] + 1e-9:
+            best = (start + slot * step, total)
+    assert best is not None
+    return best
+
+
+@pytest.mark.parametrize(
+    "profile",
+    [
+        [1.5] * 8,
+        [3.0, 3.0, 0.5, 0.5, 0.5, 2.0],
+        [0.2, 4.0, 0.2, 4.0],
+        [2.0, 0.0, 0.0, 2.0],
+        [0.5 * (i % 7) for i in range(30)],
+    ],
+)
+def test_best_window_matches_brute_force(profile: list[float]) -> None:
+    """The sliding search finds the same window as trying every start."""
+    powers = [0, 0, 0, 0, 0, 0, 0.5, 1.5, 2.5, 3.5, 4.0, 4.2, 4.0, 3.5, 2.5]
+    powers += [1.5, 0.5, 0, 0, 0, 0, 0, 0, 0, 0]
+    forecast = SolarForecast.from_api(payload(START, HOUR, powers))
+    end = START + 24 * HOUR
+
+    result = forecast.best_window(START, end, QUARTER, tuple(profile))
+
+    assert result is not None
+    expected = _brute_force_window(forecast, START, end, QUARTER, profile)
+    assert result[0] == expected[0]
+    assert result[1] == pytest.approx(expected[1])
+
+
+def test_best_window_too_long_and_cached() -> None:
+    """A load longer than the period has no window; results are cached."""
+    forecast = SolarForecast.from_api(payload(START, HOUR, [0.0, 2.0, 0.0]))
+
+    assert forecast.best_window(START, START + HOUR, QUARTER, (1.0,) * 5) is None
+    first = forecast.best_window(START, START + 2 * HOUR, QUARTER, (1.0,) * 2)
+    assert forecast.best_window(START, START + 2 * HOUR, QUARTER, (1.0,) * 2) is first
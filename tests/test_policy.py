@@ -0,0 +1,117 @@
+"""Tests for the adaptive refresh policy."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+
+from homeassistant.const import SUN_EVENT_SUNRISE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.sun import get_astral_event_date
+from homeassistant.util import dt as dt_util
+
+from custom_components.solar_prediction.const import (
+    CONF_MAX_REQUESTS_PER_DAY,
+    CONF_NIGHT_PAUSE,
+    CONF_SUNRISE_LEAD_TIME,
+)
+from custom_components.solar_prediction.policy import RefreshPolicy
+
+LEAD = timedelta(minutes=60)
+
+
+def _local(day: date, hour: int) -> datetime:
+    return dt_util.start_of_local_day(day) + timedelta(hours=hour)
+
+
+def _slot(hass: HomeAssistant, day: date) -> datetime:
+    """Return sunrise minus the lead time of a local day."""
+    return get_astral_event_date(hass, SUN_EVENT_SUNRISE, day) - LEAD
+
+
+def _policy(hass: HomeAssistant, **options) -> RefreshPolicy:
+    return RefreshPolicy(
+        hass,
+        {
+            CONF_NIGHT_PAUSE: True,
+            CONF_SUNRISE_LEAD_TIME: 60,
+            CONF_MAX_REQUESTS_PER_DAY: 24,
+            **options,
+        },
+    )
+
+
+# Normaler Tag, Beginn und Ende der Sommerzeit in US/Pacific
+DAYS = [date(2025, 6, 16), date(2025, 3, 9), date(2025, 11, 2)]
+
+
+@pytest.mark.parametrize("day", DAYS)
+async def test_night_moves_to_the_next_sunrise_slot(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, day: date
+) -> None:
+    """A request at 23:00 waits for the lead time before the next sunrise."""
+    now = _local(day - timedelta(days=1), 23)
+    freezer.move_to(now)
+    policy = _policy(hass)
+
+    result = policy.next_refresh(now + timedelta(minutes=30))
+
+    assert result == _slot(hass, day)
+    assert dt_util.as_local(result).date() == day
+
+
+async def test_daytime_request_is_kept(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+) -> None:
+    """During the day the preferred time is used unchanged."""
+    now = _local(DAYS[0], 12)
+    freezer.move_to(now)
+
+    assert _policy(hass).next_refresh(now + timedelta(hours=1)) == now + timedelta(
+        hours=1
+    )
+    # Ohne Nachtpause auch nachts
+    night = now + timedelta(hours=11)
+    assert _policy(hass, **{CONF_NIGHT_PAUSE: False}).next_refresh(night) == night
+
+
+@pytest.mark.parametrize("day", DAYS)
+async def test_used_up_cap_moves_to_the_next_day(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, day: date
+) -> None:
+    """Once the daily cap is used, the next request is the next day's slot."""
+    now = _local(day, 12)
+    freezer.move_to(now)
+    policy = _policy(hass, **{CONF_MAX_REQUESTS_PER_DAY: 3})
+    for _ in range(3):
+        policy.record_request()
+
+    result = policy.next_refresh(now + timedelta(hours=1))
+
+    assert result == _slot(hass, day + timedelta(days=1))
+    assert policy.requests_today == 3
+    freezer.move_to(result)
+    assert policy.requests_today == 0
+
+
+async def test_last_request_is_reserved_for_the_sunrise_slot(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+) -> None:
+    """Before the slot the last request of the cap waits for the slot."""
+    day = DAYS[0]
+    now = _local(day, 1)
+    freezer.move_to(now)
+    policy = _policy(hass, **{CONF_NIGHT_PAUSE: False, CONF_MAX_REQUESTS_PER_DAY: 3})
+    policy.record_request()
+
+    # Zwei frei, einer davon reserviert: die Anfrage vor dem Slot geht noch
+    assert policy.next_refresh(now + timedelta(minutes=30)) == now + timedelta(
+        minutes=30
+    )
+    policy.record_request()
+    assert policy.next_refresh(now + timedelta(minutes=30)) == _slot(hass, day)
+    # Nach dem Slot darf die letzte Anfrage gestellt werden
+    after = _slot(hass, day) + timedelta(hours=1)
+    assert policy.next_refresh(after) == after
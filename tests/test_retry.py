@@ -0,0 +1,128 @@
+"""Tests for the backoff and the circuit breaker."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from email.utils import format_datetime
+from unittest.mock import Mock, patch
+
+from aiohttp.client_exceptions import ClientConnectionError, ClientResponseError
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.solar_prediction.retry import (
+    BACKOFF_BASE,
+    BACKOFF_MAX,
+    BREAKER_COOLDOWN,
+    BREAKER_THRESHOLD,
+    CLIENT_ERROR_DELAY,
+    RATE_LIMIT_DEFAULT,
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    parse_retry_after,
+)
+
+
+def _response_error(status: int, headers: dict[str, str] | None = None):
+    return ClientResponseError(Mock(), (), status=status, headers=headers)
+
+
+def _delay(breaker: CircuitBreaker, err: Exception) -> float:
+    return (breaker.record_failure(err) - dt_util.utcnow()).total_seconds()
+
+
+@pytest.fixture(autouse=True)
+def frozen(freezer: FrozenDateTimeFactory) -> FrozenDateTimeFactory:
+    """Keep the clock still so delays can be compared exactly."""
+    freezer.move_to("2025-06-16 12:00:00+00:00")
+    return freezer
+
+
+def test_backoff_doubles_up_to_the_cap() -> None:
+    """Transient errors wait twice as long each time, at most the cap."""
+    breaker = CircuitBreaker()
+    with (
+        patch("custom_components.solar_prediction.retry.BREAKER_THRESHOLD", 100),
+        patch(
+            "custom_components.solar_prediction.retry.random.uniform",
+            side_effect=lambda low, high: high,
+        ),
+    ):
+        delays = [_delay(breaker, ClientConnectionError()) for _ in range(9)]
+
+    expected = [min(BACKOFF_MAX, BACKOFF_BASE * 2**i) for i in range(9)]
+    assert delays == expected
+    assert delays[-1] == BACKOFF_MAX
+    assert breaker.state == STATE_CLOSED
+
+
+def test_backoff_jitter_stays_within_half_and_full_delay() -> None:
+    """The jitter picks a delay between half and the full backoff."""
+    breaker = CircuitBreaker()
+    for failure in range(1, BREAKER_THRESHOLD):
+        backoff = BACKOFF_BASE * 2 ** (failure - 1)
+        assert backoff / 2 <= _delay(breaker, _response_error(503)) <= backoff
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("120", 120.0), ("0", 0.0), ("-5", 0.0), (None, None), ("", None), ("soon", None)],
+)
+def test_parse_retry_after_seconds(value: str | None, expected: float | None) -> None:
+    """Delta seconds are used as they are, invalid values are ignored."""
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date() -> None:
+    """An HTTP date is turned into the seconds until then."""
+    retry_at = dt_util.utcnow() + timedelta(seconds=90)
+
+    assert parse_retry_after(format_datetime(retry_at, usegmt=True)) == 90.0
+    past = dt_util.utcnow() - timedelta(hours=1)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+def test_rate_limit_and_client_errors() -> None:
+    """429 waits for Retry-After, other 4xx answers wait long."""
+    breaker = CircuitBreaker()
+    later = format_datetime(dt_util.utcnow() + timedelta(minutes=5), usegmt=True)
+
+    assert _delay(breaker, _response_error(429, {"Retry-After": "120"})) == 120
+    assert _delay(breaker, _response_error(429, {"Retry-After": later})) == 300
+    assert _delay(breaker, _response_error(429)) == RATE_LIMIT_DEFAULT
+    assert _delay(breaker, _response_error(401)) == CLIENT_ERROR_DELAY
+
+
+def test_breaker_opens_half_opens_and_closes(frozen: FrozenDateTimeFactory) -> None:
+    """Repeated failures open the breaker until a trial request succeeds."""
+    breaker = CircuitBreaker()
+    for _ in range(BREAKER_THRESHOLD - 1):
+        breaker.record_failure(ClientConnectionError())
+        assert breaker.state == STATE_CLOSED
+        assert breaker.allow_request()
+
+    assert _delay(breaker, ClientConnectionError()) == BREAKER_COOLDOWN
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+
+    # Nach der Abkühlzeit ist genau ein Versuch erlaubt
+    frozen.tick(BREAKER_COOLDOWN)
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+
+    # Ein Fehler im Versuch öffnet sofort wieder
+    assert _delay(breaker, ClientConnectionError()) == BREAKER_COOLDOWN
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+
+    frozen.tick(BREAKER_COOLDOWN)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.failures == 0
+    assert breaker.next_attempt is None
+    assert breaker.allow_request()
@@ -0,0 +1,157 @@
+"""Tests for the request scheduler shared by all config entries."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.solar_prediction.scheduler import (
+    BUDGET_WINDOW,
+    COALESCE_WINDOW,
+    MIN_REQUEST_SPACING,
+    RequestBudgetExceeded,
+    async_get_scheduler,
+)
+
+PARAMS = {"project": "project", "type": "hourly"}
+
+
+@pytest.fixture
+def clock():
+    """Freeze the monotonic clock of the scheduler."""
+    with patch(
+        "custom_components.solar_prediction.scheduler.time.monotonic",
+        return_value=1000.0,
+    ) as monotonic:
+        yield monotonic
+
+
+@pytest.fixture
+def mock_sleep():
+    """Skip the waits of the request spacing."""
+    with patch(
+        "custom_components.solar_prediction.scheduler.asyncio.sleep",
+        new_callable=AsyncMock,
+    ) as sleep:
+        yield sleep
+
+
+async def test_concurrent_requests_share_one_call(
+    hass: HomeAssistant, mock_fetch: AsyncMock
+) -> None:
+    """Identical requests in flight are answered by one HTTP call."""
+    release = asyncio.Event()
+
+    async def _fetch(*args):
+        await release.wait()
+        return {"data": {"1": [1, 1.0, 0.0]}}
+
+    mock_fetch.side_effect = _fetch
+    scheduler = async_get_scheduler(hass)
+    on_request = Mock()
+    first = hass.async_create_task(
+        scheduler.async_fetch("token", PARAMS, on_request=on_request)
+    )
+    second = hass.async_create_task(
+        scheduler.async_fetch("token", dict(reversed(PARAMS.items())))
+    )
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await first is await second
+    assert mock_fetch.await_count == 1
+    on_request.assert_called_once()
+
+
+async def test_response_is_reused_within_the_window(
+    hass: HomeAssistant, mock_fetch: AsyncMock, clock: Mock
+) -> None:
+    """A repeated request within a minute makes no new call."""
+    scheduler = async_get_scheduler(hass)
+    on_request = Mock()
+
+    first = await scheduler.async_fetch("token", PARAMS, on_request=on_request)
+    clock.return_value += COALESCE_WINDOW - 1
+    assert await scheduler.async_fetch("token", PARAMS, on_request=on_request) is first
+    assert mock_fetch.await_count == 1
+    assert on_request.call_count == 1
+
+    clock.return_value += 1
+    await scheduler.async_fetch("token", PARAMS, on_request=on_request)
+    assert mock_fetch.await_count == 2
+    assert on_request.call_count == 2
+
+
+async def test_daily_budget_per_token(
+    hass: HomeAssistant, mock_fetch: AsyncMock, clock: Mock, mock_sleep: AsyncMock
+) -> None:
+    """A token that used its budget is refused until the oldest call expires."""
+    scheduler = async_get_scheduler(hass)
+    with patch(
+        "custom_components.solar_prediction.scheduler.TOKEN_DAILY_REQUEST_BUDGET", 2
+    ):
+        await scheduler.async_fetch("token", {**PARAMS, "n": "1"})
+        await scheduler.async_fetch("token", {**PARAMS, "n": "2"})
+        assert scheduler.remaining_budget("token") == 0
+
+        with pytest.raises(RequestBudgetExceeded) as exc_info:
+            await scheduler.async_fetch("token", {**PARAMS, "n": "3"})
+        assert exc_info.value.retry_after == pytest.approx(BUDGET_WINDOW)
+        assert mock_fetch.await_count == 2
+
+        # Andere Tokens haben ihr eigenes Budget
+        await scheduler.async_fetch("other", PARAMS)
+        assert mock_fetch.await_count == 3
+
+        clock.return_value += BUDGET_WINDOW
+        assert scheduler.remaining_budget("token") == 1
+
+
+async def test_requests_of_one_token_are_spaced(
+    hass: HomeAssistant, mock_fetch: AsyncMock, clock: Mock, mock_sleep: AsyncMock
+) -> None:
+    """Different requests of one token wait for the spacing, others do not."""
+    scheduler = async_get_scheduler(hass)
+
+    await scheduler.async_fetch("token", {**PARAMS, "n": "1"})
+    mock_sleep.assert_not_awaited()
+    await scheduler.async_fetch("token", {**PARAMS, "n": "2"})
+    mock_sleep.assert_awaited_once_with(MIN_REQUEST_SPACING)
+    await scheduler.async_fetch("token", {**PARAMS, "n": "3"})
+    assert mock_sleep.await_args.args == (2 * MIN_REQUEST_SPACING,)
+
+    mock_sleep.reset_mock()
+    await scheduler.async_fetch("other", PARAMS)
+    mock_sleep.assert_not_awaited()
+    assert mock_fetch.await_count == 4
+
+
+@patch("custom_components.solar_prediction.scheduler.MIN_REQUEST_SPACING", 0)
+async def test_cancellation_fails_joined_callers(
+    hass: HomeAssistant, mock_fetch: AsyncMock
+) -> None:
+    """Callers sharing a cancelled request get an error instead of hanging."""
+    async def _fetch(*args):
+        await asyncio.Event().wait()
+
+    mock_fetch.side_effect = _fetch
+    scheduler = async_get_scheduler(hass)
+    first = hass.async_create_task(scheduler.async_fetch("token", PARAMS))
+    await asyncio.sleep(0)
+    second = hass.async_create_task(scheduler.async_fetch("token", PARAMS))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    with pytest.raises(HomeAssistantError, match="cancelled"):
+        await second
+
+    # Die nächste Anfrage startet wieder eine eigene
+    mock_fetch.side_effect = None
+    assert await scheduler.async_fetch("token", PARAMS) == {"data": {}}
@@ -0,0 +1,96 @@
+"""Tests for the sensors of the Solar Prediction integration."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.solar_prediction.const import DOMAIN
+from custom_components.solar_prediction.sensor import SolarPredictionTimelineSensor
+
+from . import api_response
+
+HOUR = 3600
+NOW = datetime(2025, 6, 16, 18, 10, tzinfo=dt_util.UTC)
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(with_recorder):
+    """Set up the recorder before the integration."""
+    return
+
+
+def _state(hass: HomeAssistant, key: str) -> str:
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"project_{key}"
+    )
+    assert entity_id is not None
+    return hass.states.get(entity_id).state
+
+
+async def test_timeline_sensors_step_at_each_boundary(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, mock_fetch: AsyncMock
+) -> None:
+    """Power and hour energy change exactly at the forecast boundaries."""
+    freezer.move_to(NOW)
+    start = int(NOW.timestamp()) // HOUR * HOUR - HOUR
+    mock_fetch.return_value = api_response(
+        start, HOUR, [1.0, 2.0, 3.0, 4.0, 5.0, 6.0], start + 6 * HOUR
+    )
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="project",
+        data={"access_token": "token", "project": "project"},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    # 18:10 UTC: Stützstelle 18:00 mit 2 kW, Stunde 18-19 Uhr mit 2,5 kWh
+    assert _state(hass, "power_now") == "2.0"
+    assert _state(hass, "energy_current_hour") == "2.5"
+    assert _state(hass, "energy_next_hour") == "3.5"
+
+    # Kurz vor der Grenze bleibt alles stehen
+    freezer.move_to(NOW + timedelta(minutes=49, seconds=59))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert _state(hass, "power_now") == "2.0"
+    assert _state(hass, "energy_current_hour") == "2.5"
+
+    for hour, (power, current, following) in enumerate(
+        (("3.0", "3.5", "4.5"), ("4.0", "4.5", "5.5")), start=1
+    ):
+        boundary = dt_util.utc_from_timestamp(start + (hour + 1) * HOUR)
+        freezer.move_to(boundary)
+        async_fire_time_changed(hass, boundary)
+        await hass.async_block_till_done()
+        assert _state(hass, "power_now") == power
+        assert _state(hass, "energy_current_hour") == current
+        assert _state(hass, "energy_next_hour") == following
+
+    # Ein Zeitsprung über zwei Grenzen holt beide mit einem Aufruf nach
+    jump = dt_util.utc_from_timestamp(start + 5 * HOUR + 600)
+    freezer.move_to(jump)
+    async_fire_time_changed(hass, jump)
+    await hass.async_block_till_done()
+    assert _state(hass, "power_now") == "6.0"
+    assert _state(hass, "energy_next_hour") == "unknown"
+
+    # Die Basisklasse liefert selbst keine Zeitreihe
+    with pytest.raises(TypeError):
+        SolarPredictionTimelineSensor(entry.runtime_data)
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,88 @@
+"""Tests for the long-term statistics import."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.solar_prediction.forecast import SolarForecast
+from custom_components.solar_prediction.metrics import SolarPredictionMetrics
+from custom_components.solar_prediction.statistics import ForecastStatistics
+
+from . import payload
+
+# 2025-06-16 00:00 UTC
+START = 1_750_032_000
+HOUR = 3600
+
+
+def _rows(add_statistics) -> list[tuple[int, float, float]]:
+    """Return start, state and sum of the rows of the last import."""
+    rows = add_statistics.call_args.args[2]
+    return [(int(row["start"].timestamp()), row["state"], row["sum"]) for row in rows]
+
+
+async def test_import_continues_from_watermark(hass: HomeAssistant) -> None:
+    """Only changed hours are written and their sum continues the old one."""
+    statistics = ForecastStatistics(
+        hass, "entry", "project", SolarPredictionMetrics(False)
+    )
+    forecast = SolarForecast.from_api(payload(START, HOUR, [1.0, 1.0, 1.0, 1.0, 1.0]))
+
+    with patch(
+        "custom_components.solar_prediction.statistics.async_add_external_statistics"
+    ) as add_statistics:
+        assert await statistics.async_import(forecast) == 4
+        assert _rows(add_statistics) == [
+            (START, 1.0, 1.0),
+            (START + HOUR, 1.0, 2.0),
+            (START + 2 * HOUR, 1.0, 3.0),
+            (START + 3 * HOUR, 1.0, 4.0),
+        ]
+        assert statistics.watermark == START + 3 * HOUR
+        metadata = add_statistics.call_args.args[1]
+        assert metadata["unit_class"] == "energy"
+        assert metadata["unit_of_measurement"] == "kWh"
+
+        # Unveränderte Prognose: nichts schreiben
+        add_statistics.reset_mock()
+        assert await statistics.async_import(forecast) == 0
+        add_statistics.assert_not_called()
+
+        # Ab der dritten Stunde geändert: die Summe setzt bei 2 kWh fort
+        changed = SolarForecast.from_api(
+            payload(START, HOUR, [1.0, 1.0, 1.0, 3.0, 3.0])
+        )
+        assert await statistics.async_import(changed) == 2
+        assert _rows(add_statistics) == [
+            (START + 2 * HOUR, 2.0, 4.0),
+            (START + 3 * HOUR, 3.0, 7.0),
+        ]
+        assert statistics.watermark == START + 3 * HOUR
+
+
+async def test_import_restores_watermark(hass: HomeAssistant) -> None:
+    """A new instance continues from the stored watermark."""
+    forecast = SolarForecast.from_api(payload(START, HOUR, [2.0, 2.0, 2.0]))
+    with patch(
+        "custom_components.solar_prediction.statistics.async_add_external_statistics"
+    ) as add_statistics:
+        first = ForecastStatistics(
+            hass, "entry", "project", SolarPredictionMetrics(False)
+        )
+        assert await first.async_import(forecast) == 2
+        # Verzögertes Speichern auslösen
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=30))
+        await hass.async_block_till_done()
+
+        second = ForecastStatistics(
+            hass, "entry", "project", SolarPredictionMetrics(False)
+        )
+        longer = SolarForecast.from_api(payload(START, HOUR, [2.0, 2.0, 2.0, 2.0]))
+        add_statistics.reset_mock()
+        assert await second.async_import(longer) == 1
+        assert _rows(add_statistics) == [(START + 2 * HOUR, 2.0, 6.0)]